@@ -0,0 +1,159 @@
+"""Бенчмарки горячего пути модуля фитнес-трекера.
+
+Запуск:
+    python benchmarks/bench_homework.py --sizes 1000 100000
+    python benchmarks/bench_homework.py --save baseline.json
+    python benchmarks/bench_homework.py --compare baseline.json
+
+Результат - JSON с временем в наносекундах на пакет для каждого
+сценария и размера пакета данных.
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import homework  # noqa: E402
+
+MIX = {'SWM': 0.2, 'RUN': 0.5, 'WLK': 0.3}
+
+
+def generate_packages(size: int, mix: dict = MIX, seed: int = 0) -> list:
+    """Сгенерировать пакеты с заданной долей каждого вида тренировки."""
+    rnd = random.Random(seed)
+    codes = rnd.choices(list(mix), weights=list(mix.values()), k=size)
+    packages = []
+    for code in codes:
+        action = rnd.randint(100, 30000)
+        duration = rnd.uniform(0.1, 3)
+        weight = rnd.uniform(40, 120)
+        if code == 'SWM':
+            data = [action, duration, weight,
+                    rnd.choice((25, 50)), rnd.randint(1, 80)]
+        elif code == 'WLK':
+            data = [action, duration, weight, rnd.uniform(140, 210)]
+        else:
+            data = [action, duration, weight]
+        packages.append((code, data))
+    return packages
+
+
+def _trainings(packages: list) -> list:
+    return [homework.read_package(code, data) for code, data in packages]
+
+
+def _read_package(packages: list):
+    read_package = homework.read_package
+    return lambda: [read_package(code, data) for code, data in packages]
+
+
+def _spent_calories(training_cls: type):
+    def scenario(packages: list):
+        trainings = [training for training in _trainings(packages)
+                     if type(training) is training_cls]
+        return lambda: [training.get_spent_calories()
+                        for training in trainings], len(trainings)
+    return scenario
+
+
+def _show_training_info(packages: list):
+    trainings = _trainings(packages)
+    return lambda: [training.show_training_info() for training in trainings]
+
+
+def _get_message(packages: list):
+    messages = [training.show_training_info()
+                for training in _trainings(packages)]
+    return lambda: [message.get_message() for message in messages]
+
+
+SCENARIOS = {
+    'read_package': _read_package,
+    'Running.get_spent_calories': _spent_calories(homework.Running),
+    'SportsWalking.get_spent_calories': _spent_calories(
+        homework.SportsWalking
+    ),
+    'Swimming.get_spent_calories': _spent_calories(homework.Swimming),
+    'show_training_info': _show_training_info,
+    'get_message': _get_message,
+}
+
+
+def measure(scenario, packages: list, repeat: int) -> float:
+    """Лучшее время сценария в наносекундах на пакет.
+
+    Подготовка данных выполняется заново перед каждым повтором и в
+    замер не входит.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        prepared = scenario(packages)
+        func, count = (prepared if isinstance(prepared, tuple)
+                       else (prepared, len(packages)))
+        start = perf_counter()
+        func()
+        best = min(best, (perf_counter() - start) / max(count, 1))
+    return best * 1e9
+
+
+def run(sizes: list, repeat: int, seed: int) -> dict:
+    """Выполнить все сценарии для всех размеров."""
+    results = {}
+    for size in sizes:
+        packages = generate_packages(size, seed=seed)
+        for name, scenario in SCENARIOS.items():
+            results[f'{name}/{size}'] = measure(scenario, packages, repeat)
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'unit': 'ns/package',
+        'results': results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Вернуть сценарии, замедлившиеся больше чем на threshold."""
+    regressions = []
+    for key, value in current['results'].items():
+        old = baseline['results'].get(key)
+        if old and value > old * (1 + threshold):
+            regressions.append((key, old, value))
+    return regressions
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[1000, 100000],
+                        help='размеры пакетов данных, до 10000000')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', type=Path,
+                        help='сохранить результат как базовый')
+    parser.add_argument('--compare', type=Path,
+                        help='сравнить с сохранённым базовым результатом')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='допустимое замедление, доля (0.1 = 10%%)')
+    args = parser.parse_args(argv)
+
+    current = run(args.sizes, args.repeat, args.seed)
+    print(json.dumps(current, indent=2))
+    if args.save:
+        args.save.write_text(json.dumps(current, indent=2))
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        regressions = compare(current, baseline, args.threshold)
+        for key, old, new in regressions:
+            print(f'[REGRESSION] {key}: {old:.1f} -> {new:.1f} ns',
+                  file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""Бенчмарк времени запуска homework.py как короткой команды.
+
+cli_file считает файл с пакетами в новом процессе, connect передаёт
+тот же файл тёплому процессу `homework.py --serve` через
+homework_client.py, cli_connect - через `homework.py --connect`.
+
+Запуск:
+    python benchmarks/bench_startup.py --save startup.json
+    python benchmarks/bench_startup.py --compare startup.json
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from time import perf_counter, sleep
+
+from bench_homework import compare
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+PACKAGES = 'SWM 720 1 80 25 40\nRUN 15000 1 75\nWLK 9000 1 75 180\n'
+
+
+def get_commands(packages: Path, sock: Path) -> dict:
+    """Команды для замера; packages - файл с пакетами, sock - сокет."""
+    return {
+        'python': [sys.executable, '-c', 'pass'],
+        'import': [sys.executable, '-c', 'import homework'],
+        'cli_demo': [sys.executable, 'homework.py', '--demo'],
+        'cli_file': [sys.executable, 'homework.py', str(packages)],
+        'connect': [sys.executable, 'homework_client.py', str(sock),
+                    str(packages)],
+        'cli_connect': [sys.executable, 'homework.py', '--connect',
+                        str(sock), str(packages)],
+    }
+
+
+@contextmanager
+def warm_worker(sock: Path):
+    """Запустить тёплый рабочий процесс и дождаться его сокета."""
+    process = subprocess.Popen([sys.executable, 'homework.py', '--serve',
+                                str(sock)], cwd=BASE_DIR)
+    try:
+        while not sock.exists():
+            if process.poll() is not None:
+                raise RuntimeError('Рабочий процесс не запустился.')
+            sleep(0.01)
+        yield process
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def measure(command: list, repeat: int) -> dict:
+    """Время запуска команды в миллисекундах: минимум и медиана."""
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        subprocess.run(command, cwd=BASE_DIR, check=True,
+                       stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL)
+        timings.append((perf_counter() - start) * 1000)
+    return {'min': min(timings), 'median': statistics.median(timings)}
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--save', type=Path,
+                        help='сохранить результат как базовый')
+    parser.add_argument('--compare', type=Path,
+                        help='сравнить с сохранённым базовым результатом')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='допустимое замедление, доля (0.1 = 10%%)')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        packages, sock = Path(tmp, 'packages.txt'), Path(tmp, 'worker.sock')
+        packages.write_text(PACKAGES)
+        with warm_worker(sock):
+            timings = {name: measure(command, args.repeat)
+                       for name, command in get_commands(packages,
+                                                         sock).items()}
+    current = {
+        'unit': 'ms',
+        'timings': timings,
+        'results': {name: timing['min'] for name, timing in timings.items()},
+    }
+    print(json.dumps(current, indent=2))
+    if args.save:
+        args.save.write_text(json.dumps(current, indent=2))
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        regressions = compare(current, baseline, args.threshold)
+        for key, old, new in regressions:
+            print(f'[REGRESSION] {key}: {old:.1f} -> {new:.1f} ms',
+                  file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
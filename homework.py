@@ -1,5 +1,23 @@
-from dataclasses import dataclass, field, asdict
-from typing import ClassVar
+import heapq
+import io
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict, deque
+from dataclasses import Field, astuple, dataclass, field, fields
+from datetime import date, timedelta
+from functools import partial, wraps
+from itertools import islice, repeat, starmap
+from operator import attrgetter
+from time import perf_counter, perf_counter_ns
+from typing import (TYPE_CHECKING, BinaryIO, Callable, ClassVar, Iterable,
+                    Iterator, TextIO)
+from zlib import crc32
+
+if TYPE_CHECKING:
+    import asyncio
 
 
 class Bcolors:
@@ -16,7 +34,7 @@ class Bcolors:
     UNDERLINE = '\033[4m'
 
 
-@dataclass
+@dataclass(slots=True)
 class InfoMessage:
     """Информационное сообщение о тренировке."""
 
@@ -35,11 +53,96 @@ class InfoMessage:
 
     def get_message(self) -> str:
         """Метод возврата результата тренировки."""
-        return self.MESSAGE.format(**asdict(self))
+        return self.MESSAGE.format(training_type=self.training_type,
+                                   duration=self.duration,
+                                   distance=self.distance,
+                                   speed=self.speed,
+                                   calories=self.calories)
+
+
+_MESSAGE_FIELDS = ('training_type', 'duration', 'distance', 'speed',
+                   'calories')
+
+
+def _make_positional(message: str) -> str:
+    """Заменить именованные поля шаблона сообщения позиционными."""
+    for index, name in enumerate(_MESSAGE_FIELDS):
+        message = message.replace('{' + name, '{' + str(index))
+    return message
+
+
+_MESSAGE_POSITIONAL = _make_positional(InfoMessage.MESSAGE)
+
+
+def render_many(messages: Iterable[InfoMessage], out: TextIO,
+                chunk_size: int = 1000) -> int:
+    """Записать сообщения в out построчно, одной записью на часть.
+
+    Результат совпадает с get_message() каждого сообщения.
+    """
+    get_row = attrgetter(*_MESSAGE_FIELDS)
+    render = _MESSAGE_POSITIONAL.format
+    count = 0
+    for chunk in iter_chunks(map(get_row, messages), chunk_size):
+        out.write('\n'.join(starmap(render, chunk)) + '\n')
+        count += len(chunk)
+    return count
+
+
+@dataclass(slots=True)
+class PackageError:
+    """Ошибка в пакете данных от датчиков."""
+
+    workout_type: str
+    message: str
+
+    def get_message(self) -> str:
+        """Метод возврата текста ошибки."""
+        return f'[ERROR] {self.message}'
 
 
 @dataclass
-class Training:
+class InfoBatch:
+    """Информационные сообщения о тренировках одного типа по колонкам."""
+
+    training_type: str
+    duration: list
+    distance: list
+    speed: list
+    calories: list
+    index: list = None
+
+    def __len__(self) -> int:
+        return len(self.duration)
+
+    def __iter__(self):
+        """Перебрать сообщения о тренировках пакета."""
+        for row in zip(self.duration, self.distance,
+                       self.speed, self.calories):
+            yield InfoMessage(self.training_type, *row)
+
+
+_KERNEL_METHODS = frozenset(('get_distance', 'get_mean_speed',
+                             'get_spent_calories'))
+
+
+class _TrainingMeta(type):
+    """Метакласс тренировок: пересобирает ядра расчёта, когда у класса
+    меняют или удаляют константу или метод."""
+
+    def __setattr__(cls, name: str, value) -> None:
+        super().__setattr__(name, value)
+        if not name.startswith('_'):
+            cls._rebuild_kernels()
+
+    def __delattr__(cls, name: str) -> None:
+        super().__delattr__(name)
+        if not name.startswith('_'):
+            cls._rebuild_kernels()
+
+
+@dataclass
+class Training(metaclass=_TrainingMeta):
     """Базовый класс тренировки."""
 
     action: int
@@ -48,6 +151,53 @@ class Training:
     LEN_STEP: ClassVar[float] = field(default=0.65, init=False)
     M_IN_KM: ClassVar[int] = field(default=1000, init=False)
     HOU_TO_MIN: ClassVar[int] = field(default=60, init=False)
+    NONZERO_FIELDS: ClassVar[tuple] = ('duration',)
+    _kernel: ClassVar = None
+
+    _kernel_names: ClassVar = _KERNEL_METHODS
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        """Собрать ядро расчёта для нового вида тренировки."""
+        super().__init_subclass__(**kwargs)
+        cls._setup_kernel()
+
+    @classmethod
+    def _setup_kernel(cls) -> None:
+        """Собрать ядро по текущим константам класса.
+
+        Ядро используется, только если ни класс, ни сам объект не
+        переопределяют методы расчёта, по которым оно построено, и
+        объект не переопределяет константы класса.
+        """
+        owner = next(klass for klass in cls.__mro__
+                     if '_make_kernel' in vars(klass))
+        kernel = None
+        if all(getattr(cls, name) is getattr(owner, name)
+               for name in _KERNEL_METHODS):
+            kernel = cls._make_kernel()
+        cls._kernel = None if kernel is None else staticmethod(kernel)
+        cls._kernel_names = _KERNEL_METHODS.union(
+            name for name in dir(cls) if name.isupper()
+        )
+
+    @classmethod
+    def _rebuild_kernels(cls) -> None:
+        """Пересобрать ядра класса и всех его подклассов."""
+        cls._setup_kernel()
+        for subclass in cls.__subclasses__():
+            subclass._rebuild_kernels()
+
+    @classmethod
+    def _constant(cls, name: str) -> float:
+        """Значение константы класса, в том числе ещё не обработанной
+        декоратором dataclass."""
+        value = getattr(cls, name)
+        return value.default if isinstance(value, Field) else value
+
+    @classmethod
+    def _make_kernel(cls):
+        """Вернуть функцию training -> (дистанция, скорость, калории)."""
+        return None
 
     def get_distance(self) -> float:
         """Получить дистанцию в км."""
@@ -64,11 +214,50 @@ class Training:
 
     def show_training_info(self) -> InfoMessage:
         """Вернуть информационное сообщение о выполненной тренировке."""
+        kernel = self._kernel
+        if (kernel is not None and self._kernel_names.isdisjoint(
+                getattr(self, '__dict__', ()))):
+            return InfoMessage(self.__class__.__name__, self.duration,
+                               *kernel(self))
         return InfoMessage(self.__class__.__name__,
                            self.duration, self.get_distance(),
                            self.get_mean_speed(),
                            self.get_spent_calories())
 
+    @classmethod
+    def get_batch_distance(cls, columns: list) -> list:
+        """Получить дистанции в км для колонок данных."""
+        len_step, m_in_km = cls.LEN_STEP, cls.M_IN_KM
+        return [action * len_step / m_in_km for action in columns[0]]
+
+    @classmethod
+    def get_batch_mean_speed(cls, columns: list,
+                             distance: list = None) -> list:
+        """Получить средние скорости для колонок данных."""
+        if distance is None:
+            distance = cls.get_batch_distance(columns)
+        return [dist / duration
+                for dist, duration in zip(distance, columns[1])]
+
+    @classmethod
+    def get_batch_spent_calories(cls, columns: list, speed: list) -> list:
+        """Получить затраченные калории для колонок данных."""
+        raise NotImplementedError(f'Определите метод '
+                                  f'get_batch_spent_calories в '
+                                  f'{cls.__name__}')
+
+    @classmethod
+    def show_batch_info(cls, columns: list) -> InfoBatch:
+        """Вернуть сообщения о тренировках, заданных колонками данных."""
+        distance = cls.get_batch_distance(columns)
+        speed = cls.get_batch_mean_speed(columns, distance)
+        return InfoBatch(cls.__name__, list(columns[1]), distance, speed,
+                         cls.get_batch_spent_calories(columns, speed))
+
+    def show_lazy_info(self) -> 'LazyInfoMessage':
+        """Вернуть сообщение, поля которого считаются при обращении."""
+        return LazyInfoMessage(self)
+
 
 class Running(Training):
     """Тренировка: бег."""
@@ -82,6 +271,33 @@ class Running(Training):
                  - self.RUN_COEF_SEC)
                 * self.weight / self.M_IN_KM * self.duration * self.HOU_TO_MIN)
 
+    @classmethod
+    def _make_kernel(cls):
+        """Вернуть функцию training -> (дистанция, скорость, калории)."""
+        len_step, m_in_km = cls._constant('LEN_STEP'), cls._constant('M_IN_KM')
+        hou_to_min = cls._constant('HOU_TO_MIN')
+        coef_first = cls._constant('RUN_COEF_FIRST')
+        coef_sec = cls._constant('RUN_COEF_SEC')
+
+        def kernel(training: Training) -> tuple:
+            duration = training.duration
+            distance = training.action * len_step / m_in_km
+            speed = distance / duration
+            return distance, speed, ((coef_first * speed - coef_sec)
+                                     * training.weight / m_in_km
+                                     * duration * hou_to_min)
+        return kernel
+
+    @classmethod
+    def get_batch_spent_calories(cls, columns: list, speed: list) -> list:
+        """Получить затраченные калории для колонок данных."""
+        coef_first, coef_sec = cls.RUN_COEF_FIRST, cls.RUN_COEF_SEC
+        m_in_km, hou_to_min = cls.M_IN_KM, cls.HOU_TO_MIN
+        return [(coef_first * mean_speed - coef_sec)
+                * weight / m_in_km * duration * hou_to_min
+                for mean_speed, duration, weight
+                in zip(speed, columns[1], columns[2])]
+
 
 @dataclass
 class SportsWalking(Training):
@@ -91,6 +307,7 @@ class SportsWalking(Training):
     SWLK_COEF_FIRST: ClassVar[float] = 0.035
     SWLK_COEF_SEC: ClassVar[float] = 2
     SWLK_COEF_THIRD: ClassVar[float] = 0.029
+    NONZERO_FIELDS: ClassVar[tuple] = ('duration', 'height')
 
     def get_spent_calories(self) -> float:
         """Получить количество затраченных калорий."""
@@ -99,6 +316,36 @@ class SportsWalking(Training):
                  * self.SWLK_COEF_THIRD * self.weight) * self.duration
                 * self.HOU_TO_MIN)
 
+    @classmethod
+    def _make_kernel(cls):
+        """Вернуть функцию training -> (дистанция, скорость, калории)."""
+        len_step, m_in_km = cls._constant('LEN_STEP'), cls._constant('M_IN_KM')
+        hou_to_min = cls._constant('HOU_TO_MIN')
+        coef_first = cls._constant('SWLK_COEF_FIRST')
+        coef_sec = cls._constant('SWLK_COEF_SEC')
+        coef_third = cls._constant('SWLK_COEF_THIRD')
+
+        def kernel(training: Training) -> tuple:
+            duration, weight = training.duration, training.weight
+            distance = training.action * len_step / m_in_km
+            speed = distance / duration
+            return distance, speed, ((coef_first * weight
+                                      + (speed ** coef_sec // training.height)
+                                      * coef_third * weight)
+                                     * duration * hou_to_min)
+        return kernel
+
+    @classmethod
+    def get_batch_spent_calories(cls, columns: list, speed: list) -> list:
+        """Получить затраченные калории для колонок данных."""
+        coef_first, coef_sec = cls.SWLK_COEF_FIRST, cls.SWLK_COEF_SEC
+        coef_third, hou_to_min = cls.SWLK_COEF_THIRD, cls.HOU_TO_MIN
+        return [(coef_first * weight
+                 + (mean_speed ** coef_sec // height) * coef_third * weight)
+                * duration * hou_to_min
+                for mean_speed, duration, weight, height
+                in zip(speed, columns[1], columns[2], columns[3])]
+
 
 @dataclass
 class Swimming(Training):
@@ -120,38 +367,1479 @@ class Swimming(Training):
         return ((self.get_mean_speed() + self.SWM_COEF_FIRST)
                 * self.SWM_COEF_SEC * self.weight)
 
+    @classmethod
+    def _make_kernel(cls):
+        """Вернуть функцию training -> (дистанция, скорость, калории)."""
+        len_step, m_in_km = cls._constant('LEN_STEP'), cls._constant('M_IN_KM')
+        coef_first = cls._constant('SWM_COEF_FIRST')
+        coef_sec = cls._constant('SWM_COEF_SEC')
+
+        def kernel(training: Training) -> tuple:
+            speed = (training.length_pool * training.count_pool
+                     / m_in_km / training.duration)
+            return (training.action * len_step / m_in_km, speed,
+                    (speed + coef_first) * coef_sec * training.weight)
+        return kernel
+
+    @classmethod
+    def get_batch_mean_speed(cls, columns: list,
+                             distance: list = None) -> list:
+        """Получить средние скорости для колонок данных."""
+        m_in_km = cls.M_IN_KM
+        return [length_pool * count_pool / m_in_km / duration
+                for duration, length_pool, count_pool
+                in zip(columns[1], columns[3], columns[4])]
+
+    @classmethod
+    def get_batch_spent_calories(cls, columns: list, speed: list) -> list:
+        """Получить затраченные калории для колонок данных."""
+        coef_first, coef_sec = cls.SWM_COEF_FIRST, cls.SWM_COEF_SEC
+        return [(mean_speed + coef_first) * coef_sec * weight
+                for mean_speed, weight in zip(speed, columns[2])]
+
+
+class LazyInfoMessage:
+    """Сообщение о тренировке с расчётом полей при первом обращении.
+
+    Совместимо с InfoMessage по полям и методу get_message().
+    """
+
+    __slots__ = ('_training', '_distance', '_speed', '_calories')
+    MESSAGE = InfoMessage.MESSAGE
+
+    def __init__(self, training: Training) -> None:
+        self._training = training
+
+    @property
+    def training_type(self) -> str:
+        return self._training.__class__.__name__
+
+    @property
+    def duration(self) -> float:
+        return self._training.duration
+
+    @property
+    def distance(self) -> float:
+        try:
+            return self._distance
+        except AttributeError:
+            self._distance = self._training.get_distance()
+            return self._distance
+
+    @property
+    def speed(self) -> float:
+        try:
+            return self._speed
+        except AttributeError:
+            self._speed = self._training.get_mean_speed()
+            return self._speed
+
+    @property
+    def calories(self) -> float:
+        try:
+            return self._calories
+        except AttributeError:
+            self._calories = self._training.get_spent_calories()
+            return self._calories
+
+    def get_message(self) -> str:
+        """Метод возврата результата тренировки."""
+        return InfoMessage.get_message(self)
+
+    def to_info(self) -> InfoMessage:
+        """Рассчитать все поля и вернуть InfoMessage."""
+        return InfoMessage(self.training_type, self.duration, self.distance,
+                           self.speed, self.calories)
+
+
+class LazyInfoBatch:
+    """Колонки сообщений о тренировках, считающиеся при обращении.
+
+    Совместимо с InfoBatch; обращение только к calories не считает
+    колонки, которые для калорий не нужны.
+    """
+
+    def __init__(self, training_cls: type, columns: list) -> None:
+        self.training_type = training_cls.__name__
+        self.index = None
+        self._training_cls = training_cls
+        self._columns = columns
+        self._distance = None
+        self._speed = None
+        self._calories = None
+
+    def __len__(self) -> int:
+        return len(self._columns[1])
+
+    def __iter__(self):
+        return iter(InfoBatch(self.training_type, self.duration,
+                              self.distance, self.speed, self.calories))
+
+    @property
+    def duration(self) -> list:
+        return list(self._columns[1])
+
+    @property
+    def distance(self) -> list:
+        if self._distance is None:
+            self._distance = self._training_cls.get_batch_distance(
+                self._columns
+            )
+        return self._distance
+
+    @property
+    def speed(self) -> list:
+        if self._speed is None:
+            self._speed = self._training_cls.get_batch_mean_speed(
+                self._columns, self._distance
+            )
+        return self._speed
+
+    @property
+    def calories(self) -> list:
+        if self._calories is None:
+            self._calories = self._training_cls.get_batch_spent_calories(
+                self._columns, self.speed
+            )
+        return self._calories
+
+
+class TrainingService:
+    """Потокобезопасный расчёт тренировок с общим хранилищем результатов.
+
+    Готовые результаты читаются без блокировки. Одинаковые пакеты,
+    которые считаются одновременно в разных потоках, считаются один раз:
+    остальные потоки ждут результат первого. В хранилище не больше
+    maxsize результатов, при переполнении вытесняются самые старые.
+    """
+
+    def __init__(self, max_workers: int = 4, maxsize: int = 100000) -> None:
+        import threading
 
-def read_package(workout_type: str, data: list) -> Training:
+        self.max_workers = max_workers
+        self.maxsize = maxsize
+        self.evictions = 0
+        self._results = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def __enter__(self) -> 'TrainingService':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def get_info(self, workout_type: str,
+                 data: list) -> InfoMessage | PackageError:
+        """Вернуть сообщение о тренировке из хранилища или рассчитать его."""
+        key = (workout_type, tuple(data))
+        result = self._results.get(key)
+        if result is not None:
+            return result
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                return result
+            future = self._pending.get(key)
+            if future is None:
+                from concurrent.futures import Future
+
+                future = self._pending[key] = Future()
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            return future.result()
+        try:
+            training = read_package(workout_type, data)
+            if not isinstance(training, PackageError):
+                training = training.show_training_info()
+        except BaseException as error:
+            with self._lock:
+                del self._pending[key]
+            future.set_exception(error)
+            raise
+        with self._lock:
+            self._results[key] = training
+            while len(self._results) > self.maxsize:
+                del self._results[next(iter(self._results))]
+                self.evictions += 1
+            del self._pending[key]
+        future.set_result(training)
+        return training
+
+    def get_many(self, packages: Iterable[tuple]) -> list:
+        """Рассчитать пакеты в пуле из max_workers потоков."""
+        if self._executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.max_workers)
+        packages = list(packages)
+        return list(self._executor.map(
+            self.get_info,
+            [workout_type for workout_type, _ in packages],
+            [data for _, data in packages]
+        ))
+
+    def clear(self) -> None:
+        """Очистить хранилище результатов."""
+        with self._lock:
+            self._results.clear()
+
+    def close(self) -> None:
+        """Остановить пул потоков."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+class TrainingInfoCache:
+    """LRU-кэш результатов расчёта пакетов.
+
+    Ключ - (workout_type, data). Возвращаемые InfoMessage общие для всех
+    обращений с тем же пакетом, изменять их нельзя.
+    """
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._results = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def get_info(self, workout_type: str,
+                 data: list) -> InfoMessage | PackageError:
+        """Вернуть сообщение о тренировке, рассчитав его при промахе."""
+        key = (workout_type, tuple(data))
+        try:
+            info = self._results[key]
+        except KeyError:
+            self.misses += 1
+            training = read_package(workout_type, data)
+            if isinstance(training, PackageError):
+                return training
+            info = self._results[key] = training.show_training_info()
+            self._evict()
+        else:
+            self.hits += 1
+            self._results.move_to_end(key)
+        return info
+
+    def clear(self) -> None:
+        """Очистить кэш и обнулить счётчики."""
+        self._results.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def resize(self, maxsize: int) -> None:
+        """Изменить размер кэша, вытеснив лишние записи."""
+        self.maxsize = maxsize
+        self._evict()
+
+    def _evict(self) -> None:
+        while len(self._results) > self.maxsize:
+            self._results.popitem(last=False)
+            self.evictions += 1
+
+
+def _make_row_class(training_cls: type) -> type:
+    """Создать класс-представление строки колонок для класса тренировки."""
+    namespace = {}
+    for klass in reversed(training_cls.__mro__[:-1]):
+        namespace.update((name, value) for name, value in vars(klass).items()
+                         if not name.startswith('__'))
+    for index, training_field in enumerate(fields(training_cls)):
+        namespace[training_field.name] = property(
+            lambda self, index=index: self._columns[index][self._index]
+        )
+    namespace['__slots__'] = ('_columns', '_index')
+    namespace['__init__'] = _row_init
+    return type(training_cls.__name__, (), namespace)
+
+
+def _row_init(self, columns: list, index: int) -> None:
+    self._columns = columns
+    self._index = index
+
+
+class TrainingArray:
+    """Тренировки одного типа, хранящиеся в типизированных колонках.
+
+    Элементы массива - представления строк с тем же API, что и у
+    класса тренировки: get_distance, get_mean_speed, get_spent_calories,
+    show_training_info.
+    """
+
+    def __init__(self, training_cls: type, rows: Iterable = ()) -> None:
+        self.training_cls = training_cls
+        self.field_names = [item.name for item in fields(training_cls)]
+        self.columns = [array('d') for _ in self.field_names]
+        self._row_cls = _make_row_class(training_cls)
+        for data in rows:
+            self.append(data)
+
+    def __len__(self) -> int:
+        return len(self.columns[0])
+
+    def __getitem__(self, index: int):
+        index = range(len(self))[index]
+        return self._row_cls(self.columns, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self._row_cls(self.columns, index)
+
+    def append(self, data: list) -> None:
+        """Добавить тренировку по данным пакета."""
+        if len(data) != len(self.columns):
+            raise TypeError(f'{self.training_cls.__name__} ожидает '
+                            f'{len(self.columns)} значений, '
+                            f'получено {len(data)}')
+        for column, value in zip(self.columns, data):
+            column.append(value)
+
+    def show_batch_info(self) -> InfoBatch:
+        """Рассчитать все тренировки массива по колонкам."""
+        return self.training_cls.show_batch_info(self.columns)
+
+
+_TRAINING_TYPES = {}
+
+
+def _make_value_check(training_cls: type, nonzero: tuple):
+    """Собрать проверку значений пакета для класса тренировки.
+
+    Проверка возвращает PackageError для нечисловых значений и нулей в
+    полях NONZERO_FIELDS, иначе None.
+    """
+    name = training_cls.__name__
+    zero_message = (f'{name}: поля {", ".join(training_cls.NONZERO_FIELDS)} '
+                    f'не могут быть равны нулю.')
+
+    def check(workout_type: str, data: list) -> PackageError | None:
+        try:
+            sum(data)
+        except TypeError:
+            return PackageError(workout_type,
+                                f'{name}: нечисловое значение в пакете.')
+        for index in nonzero:
+            if not data[index]:
+                return PackageError(workout_type, zero_message)
+        return None
+    return check
+
+
+def register_training(workout_type: str, training_cls: type) -> None:
+    """Зарегистрировать класс тренировки для кода workout_type.
+
+    Заранее вычисляются число аргументов, номера полей-делителей и
+    проверка значений пакета.
+    """
+    names = [item.name for item in fields(training_cls) if item.init]
+    nonzero = tuple(names.index(name)
+                    for name in training_cls.NONZERO_FIELDS)
+    _TRAINING_TYPES[workout_type] = (
+        training_cls, len(names), nonzero,
+        _make_value_check(training_cls, nonzero)
+    )
+
+
+register_training('SWM', Swimming)
+register_training('RUN', Running)
+register_training('WLK', SportsWalking)
+
+
+def _package_error(workout_type: str, size: int) -> PackageError:
+    """Описать, чем пакет с кодом и числом значений некорректен."""
+    if workout_type not in _TRAINING_TYPES:
+        return PackageError(workout_type, f'В словаре не найден ключ '
+                                          f'тренировки: {workout_type}.')
+    training_cls, arity, *_ = _TRAINING_TYPES[workout_type]
+    return PackageError(workout_type, f'{training_cls.__name__} ожидает '
+                                      f'{arity} значений, получено {size}.')
+
+
+PACKAGE_OK = 0
+PACKAGE_UNKNOWN_TYPE = 1
+PACKAGE_BAD_ARITY = 2
+PACKAGE_BAD_VALUE = 3
+PACKAGE_ZERO_DIVISOR = 4
+PACKAGE_NEGATIVE = 5
+VALIDATION_MESSAGES = (
+    'без ошибок',
+    'неизвестный код тренировки',
+    'неверное число значений',
+    'нечисловое значение',
+    'ноль в делителе',
+    'отрицательное значение',
+)
+
+
+@dataclass
+class ValidationReport:
+    """Результат проверки пакетов.
+
+    errors содержит код ошибки PACKAGE_* для каждого пакета по порядку,
+    counts - число пакетов с каждым кодом.
+    """
+
+    errors: bytearray
+    counts: list
+
+    def is_valid(self) -> bool:
+        return self.counts[PACKAGE_OK] == len(self.errors)
+
+    def get_bad_indexes(self) -> list:
+        """Вернуть номера пакетов с ошибками."""
+        return [index for index, code in enumerate(self.errors) if code]
+
+    def get_summary(self) -> dict:
+        """Вернуть число пакетов по описаниям ошибок."""
+        return {VALIDATION_MESSAGES[code]: count
+                for code, count in enumerate(self.counts) if count}
+
+
+def validate_packages(packages: Iterable[tuple]) -> ValidationReport:
+    """Проверить пакеты, не создавая объектов и не прерываясь на ошибках."""
+    errors = bytearray()
+    counts = [0] * len(VALIDATION_MESSAGES)
+    training_types = _TRAINING_TYPES
+    for workout_type, data in packages:
+        entry = training_types.get(workout_type)
+        if entry is None:
+            code = PACKAGE_UNKNOWN_TYPE
+        elif len(data) != entry[1]:
+            code = PACKAGE_BAD_ARITY
+        else:
+            try:
+                if 0 in map(data.__getitem__, entry[2]):
+                    code = PACKAGE_ZERO_DIVISOR
+                elif min(data) < 0:
+                    code = PACKAGE_NEGATIVE
+                else:
+                    code = PACKAGE_OK
+            except TypeError:
+                code = PACKAGE_BAD_VALUE
+        errors.append(code)
+        counts[code] += 1
+    return ValidationReport(errors, counts)
+
+
+def read_package(workout_type: str, data: list) -> Training | PackageError:
     """Прочитать данные полученные от датчиков."""
+    entry = _TRAINING_TYPES.get(workout_type)
+    if entry is None or len(data) != entry[1]:
+        return _package_error(workout_type, len(data))
+    error = entry[3](workout_type, data)
+    if error is not None:
+        return error
+    return entry[0](*data)
+
+
+def read_packages(packages: Iterable[tuple]) -> list:
+    """Прочитать пакеты; на месте некорректных остаются PackageError."""
+    return [read_package(workout_type, data)
+            for workout_type, data in packages]
+
+
+def read_batch(workout_type: str, columns: list) -> InfoBatch | PackageError:
+    """Рассчитать тренировки одного типа, заданные колонками данных."""
+    entry = _TRAINING_TYPES.get(workout_type)
+    if entry is None or len(columns) != entry[1]:
+        return _package_error(workout_type, len(columns))
+    return entry[0].show_batch_info(columns)
+
+
+_SECTION_HEADER = struct.Struct('<4sB3sB7xQ')
+_SECTION_MAGIC = b'HWPK'
+_SECTION_VERSION = 1
+
+
+def write_binary(out: BinaryIO, workout_type: str, columns: list) -> None:
+    """Записать колонки пакетов одного вида тренировки в двоичный файл.
+
+    Секция файла - заголовок с кодом тренировки, числом колонок и числом
+    записей, за которым колонки идут подряд как little-endian float64.
+    Секции разных видов можно записывать в один файл друг за другом.
+    """
+    entry = _TRAINING_TYPES.get(workout_type)
+    if entry is None or len(columns) != entry[1]:
+        raise ValueError(_package_error(workout_type, len(columns)).message)
+    if not workout_type.isascii() or len(workout_type) != 3:
+        raise ValueError(f'Код тренировки для двоичного файла должен '
+                         f'состоять из 3 ASCII-символов: {workout_type}.')
+    columns = [array('d', column) for column in columns]
+    size = len(columns[0])
+    if any(len(column) != size for column in columns):
+        raise ValueError('Колонки должны быть одной длины.')
+    out.write(_SECTION_HEADER.pack(_SECTION_MAGIC, _SECTION_VERSION,
+                                   workout_type.encode('ascii'),
+                                   len(columns), size))
+    for column in columns:
+        if sys.byteorder != 'little':
+            column.byteswap()
+        column.tofile(out)
+
+
+class PackageFile:
+    """Файл пакетов, отображённый в память.
+
+    sections - список пар (workout_type, columns), где колонки -
+    memoryview над отображённым файлом, без копирования данных.
+    """
+
+    def __init__(self, path: str) -> None:
+        if sys.byteorder != 'little':
+            raise OSError('Чтение без копирования возможно только '
+                          'на little-endian платформах.')
+        import mmap
+
+        with open(path, 'rb') as packages_file:
+            self._mmap = mmap.mmap(packages_file.fileno(), 0,
+                                   access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        self.sections = []
+        offset = 0
+        try:
+            while offset < len(self._view):
+                offset = self._read_section(offset)
+        except ValueError:
+            self.close()
+            raise
+
+    def _read_section(self, offset: int) -> int:
+        if offset + _SECTION_HEADER.size > len(self._view):
+            raise ValueError(f'Неполный заголовок секции: {offset}.')
+        magic, version, code, count, size = _SECTION_HEADER.unpack_from(
+            self._view, offset
+        )
+        if magic != _SECTION_MAGIC or version != _SECTION_VERSION:
+            raise ValueError(f'Некорректный заголовок секции: {offset}.')
+        offset += _SECTION_HEADER.size
+        if offset + count * size * 8 > len(self._view):
+            raise ValueError(f'Секция {code!r} выходит за конец файла.')
+        columns = []
+        for _ in range(count):
+            end = offset + size * 8
+            columns.append(self._view[offset:end].cast('d'))
+            offset = end
+        self.sections.append((code.decode('ascii'), columns))
+        return offset
+
+    def __enter__(self) -> 'PackageFile':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def show_batch_info(self) -> list:
+        """Рассчитать все секции файла по колонкам."""
+        return [read_batch(workout_type, columns)
+                for workout_type, columns in self.sections]
+
+    def close(self) -> None:
+        """Освободить колонки и закрыть отображение файла."""
+        for _, columns in self.sections:
+            for column in columns:
+                column.release()
+        self.sections = []
+        self._view.release()
+        self._mmap.close()
+
+
+def parse_package(line: str) -> tuple:
+    """Разобрать пакет вида `SWM 720 1 80 25 40`."""
+    workout_type, *values = line.split()
+    return workout_type, [float(value) for value in values]
+
+
+def parse_packages(lines: Iterable[str]) -> Iterator[tuple]:
+    """Разобрать пакеты, по одному на строку, пропуская пустые строки.
+
+    Вместо некорректной строки возвращается PackageError.
+    """
+    for line in lines:
+        if line.strip():
+            try:
+                yield parse_package(line)
+            except ValueError:
+                yield PackageError(line.split()[0],
+                                   f'Некорректный пакет: {line.strip()}')
+
+
+def iter_chunks(iterable: Iterable, chunk_size: int) -> Iterator[list]:
+    """Разбить поток на списки длиной не более chunk_size."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, chunk_size)):
+        yield chunk
+
+
+def _package_message(package: tuple | PackageError) -> str:
+    """Вернуть сообщение о тренировке или текст ошибки пакета.
+
+    Ошибки расчёта (переполнение, деление на ноль) тоже возвращаются
+    строкой [ERROR], чтобы один пакет не прерывал обработку потока.
+    """
+    if isinstance(package, PackageError):
+        return package.get_message()
+    training = read_package(*package)
+    if isinstance(training, PackageError):
+        return training.get_message()
+    try:
+        return training.show_training_info().get_message()
+    except (ArithmeticError, ValueError) as error:
+        workout_type, data = package
+        values = ' '.join(f'{value:g}' for value in data)
+        return (f'[ERROR] Ошибка расчёта пакета {workout_type} {values}: '
+                f'{error}')
+
+
+def process_packages(packages: Iterable[tuple],
+                     chunk_size: int = 1000) -> Iterator[list]:
+    """Рассчитать поток пакетов и вернуть сообщения частями.
+
+    Для PackageError в потоке, некорректных пакетов и ошибок расчёта
+    возвращается текст ошибки.
+    """
+    for chunk in iter_chunks(packages, chunk_size):
+        yield [_package_message(package) for package in chunk]
+
+
+def run_stream(infile: TextIO, outfile: TextIO,
+               chunk_size: int = 1000) -> int:
+    """Обработать пакеты из файла и записать сообщения в outfile."""
+    count = 0
+    for messages in process_packages(parse_packages(infile), chunk_size):
+        if messages:
+            outfile.write('\n'.join(messages) + '\n')
+            count += len(messages)
+    return count
+
+
+def _check_package(workout_type: str, data: list) -> PackageError | None:
+    """Проверить пакет так же, как read_package, не создавая объект."""
+    entry = _TRAINING_TYPES.get(workout_type)
+    if entry is None or len(data) != entry[1]:
+        return _package_error(workout_type, len(data))
+    return entry[3](workout_type, data)
+
+
+def iter_batches(packages: Iterable[tuple], chunk_size: int = 100000,
+                 errors: list = None) -> Iterator[InfoBatch]:
+    """Рассчитать поток пакетов по колонкам, частями по chunk_size.
+
+    Внутри части пакеты группируются по виду тренировки; в index
+    каждого пакета хранятся номера строк во входном потоке.
+    Некорректные пакеты пропускаются, а в список errors, если он
+    передан, добавляются пары (номер строки, PackageError).
+    """
+    position = 0
+    for chunk in iter_chunks(packages, chunk_size):
+        groups = {}
+        for workout_type, data in chunk:
+            error = _check_package(workout_type, data)
+            if error is None:
+                rows, indexes = groups.setdefault(workout_type, ([], []))
+                rows.append(data)
+                indexes.append(position)
+            elif errors is not None:
+                errors.append((position, error))
+            position += 1
+        for workout_type, (rows, indexes) in groups.items():
+            batch = read_batch(workout_type, list(zip(*rows)))
+            batch.index = indexes
+            yield batch
+
+
+def export_columns(batches: Iterable[InfoBatch]) -> dict:
+    """Собрать результаты в колонки: номера строк, типы и float64.
+
+    Для пакетов без index номер строки равен -1.
+    """
+    columns = {name: array('d') for name in _MESSAGE_FIELDS[1:]}
+    columns['index'] = array('q')
+    columns['training_type'] = []
+    for batch in batches:
+        columns['index'].extend(batch.index if batch.index is not None
+                                else [-1] * len(batch))
+        columns['training_type'].extend([batch.training_type] * len(batch))
+        for name in _MESSAGE_FIELDS[1:]:
+            columns[name].extend(getattr(batch, name))
+    return columns
+
+
+def write_csv(batches: Iterable[InfoBatch], out: TextIO,
+              header: bool = True) -> int:
+    """Записать результаты в CSV, одной записью на каждый пакет batches.
+
+    Первая колонка - номер строки во входном потоке (пустая для пакетов
+    без index). Числа записываются через repr и читаются обратно без
+    потери точности.
+    """
+    if header:
+        out.write(','.join(('index', *_MESSAGE_FIELDS)) + '\n')
+    count = 0
+    for batch in batches:
+        index = batch.index if batch.index is not None else repeat('')
+        row = '%s,' + batch.training_type + ',%r,%r,%r,%r\n'
+        out.write(''.join([row % values for values in zip(
+            index, batch.duration, batch.distance, batch.speed,
+            batch.calories
+        )]))
+        count += len(batch)
+    return count
+
+
+def compute_packages(packages: Iterable[tuple]) -> list:
+    """Рассчитать пакеты и вернуть результаты кортежами полей InfoMessage.
+
+    Для нераспознанных пакетов в списке остаётся None.
+    """
+    results = []
+    for workout_type, data in packages:
+        training = read_package(workout_type, data)
+        if isinstance(training, PackageError):
+            results.append(None)
+            continue
+        info = training.show_training_info()
+        results.append((info.training_type, info.duration, info.distance,
+                        info.speed, info.calories))
+    return results
+
+
+def process_parallel(packages: Iterable[tuple], workers: int = None,
+                     chunk_size: int = 10000) -> list:
+    """Рассчитать пакеты в нескольких процессах с сохранением порядка.
+
+    При workers=1 или небольшом числе пакетов расчёт идёт в текущем
+    процессе.
+    """
+    packages = list(packages)
+    if workers == 1 or len(packages) <= chunk_size:
+        return compute_packages(packages)
+    from concurrent.futures import ProcessPoolExecutor
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk in executor.map(compute_packages,
+                                  iter_chunks(packages, chunk_size)):
+            results.extend(chunk)
+    return results
+
+
+def answer_packages(lines: Iterable[str]) -> list:
+    """Вернуть по одной строке ответа на каждую строку с пакетом."""
+    answers = []
+    for line in lines:
+        try:
+            package = parse_package(line)
+        except ValueError:
+            answers.append(f'[ERROR] Некорректный пакет: {line.strip()}')
+            continue
+        answers.append(_package_message(package))
+    return answers
+
+
+async def _read_lines(reader: 'asyncio.StreamReader',
+                      queue: 'asyncio.Queue') -> None:
+    # Строка не в UTF-8 получает символы замены и ответ [ERROR].
+    # При отмене признак конца не ставится: очередь уже никто не читает,
+    # и ожидание места в ней не дало бы задаче завершиться.
+    try:
+        while line := await reader.readline():
+            await queue.put(line.decode(errors='replace'))
+    except ConnectionError:
+        pass
+    await queue.put(None)
+
+
+async def handle_connection(reader: 'asyncio.StreamReader',
+                            writer: 'asyncio.StreamWriter',
+                            batch_size: int = 100,
+                            queue_size: int = 1000) -> None:
+    """Обслужить соединение: пакеты по строкам, ответ на каждую строку.
+
+    Чтение останавливается, пока очередь соединения заполнена, а запись
+    ждёт клиента через drain(), поэтому медленный клиент тормозит
+    только своё соединение.
+    """
+    import asyncio
+
+    queue = asyncio.Queue(maxsize=queue_size)
+    reading = asyncio.create_task(_read_lines(reader, queue))
+    try:
+        finished = False
+        while not finished:
+            batch = [await queue.get()]
+            while len(batch) < batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            if batch[-1] is None:
+                finished = True
+                batch.pop()
+            if batch:
+                writer.write(('\n'.join(answer_packages(batch))
+                              + '\n').encode())
+                await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        reading.cancel()
+        writer.close()
+
+
+async def start_server(host: str = '127.0.0.1', port: int = 0,
+                       path: str = None, batch_size: int = 100,
+                       queue_size: int = 1000) -> 'asyncio.AbstractServer':
+    """Запустить TCP-сервер или, если задан path, сервер на Unix-сокете."""
+    import asyncio
+
+    handler = partial(handle_connection, batch_size=batch_size,
+                      queue_size=queue_size)
+    if path is not None:
+        return await asyncio.start_unix_server(handler, path)
+    return await asyncio.start_server(handler, host, port)
+
+
+@dataclass(slots=True)
+class Totals:
+    """Накопленные итоги тренировок."""
+
+    count: int = 0
+    duration: float = 0
+    distance: float = 0
+    calories: float = 0
+    speed_duration: float = 0
+
+    def add(self, info: InfoMessage) -> None:
+        """Учесть одну тренировку."""
+        self.count += 1
+        self.duration += info.duration
+        self.distance += info.distance
+        self.calories += info.calories
+        self.speed_duration += info.speed * info.duration
+
+    def merge(self, other: 'Totals') -> None:
+        """Добавить итоги, посчитанные отдельно."""
+        self.count += other.count
+        self.duration += other.duration
+        self.distance += other.distance
+        self.calories += other.calories
+        self.speed_duration += other.speed_duration
+
+    def get_mean_speed(self) -> float:
+        """Получить среднюю скорость за все учтённые тренировки.
+
+        Скорости тренировок усредняются с весом длительности: у плавания
+        скорость считается не по дистанции.
+        """
+        return self.speed_duration / self.duration if self.duration else 0.0
+
+
+class TrainingAggregator:
+    """Итоги тренировок по спортсменам и видам тренировок.
+
+    Итоги ведутся за всё время, по дням и по неделям (неделя задаётся
+    датой своего понедельника); каждая тренировка обновляет их за O(1).
+    """
+
+    def __init__(self) -> None:
+        self.totals = {}
+
+    def add(self, user, day: date, info: InfoMessage | Training) -> None:
+        """Учесть тренировку спортсмена user, прошедшую в день day."""
+        if isinstance(info, Training):
+            info = info.show_training_info()
+        week = day - timedelta(days=day.weekday())
+        for key in ((user, info.training_type, 'all', ''),
+                    (user, info.training_type, 'day', day.isoformat()),
+                    (user, info.training_type, 'week', week.isoformat())):
+            totals = self.totals.get(key)
+            if totals is None:
+                totals = self.totals[key] = Totals()
+            totals.add(info)
+
+    def get(self, user, training_type: str, period: str = 'all',
+            day: date = None) -> Totals:
+        """Вернуть итоги за всё время, за день или за неделю дня day."""
+        start = ''
+        if period == 'day':
+            start = day.isoformat()
+        elif period == 'week':
+            start = (day - timedelta(days=day.weekday())).isoformat()
+        return self.totals.get((user, training_type, period, start),
+                               Totals())
+
+    def merge(self, other: 'TrainingAggregator') -> None:
+        """Добавить итоги, посчитанные в другом процессе."""
+        for key, totals in other.totals.items():
+            own = self.totals.get(key)
+            if own is None:
+                own = self.totals[key] = Totals()
+            own.merge(totals)
+
+    def save(self, path: str) -> None:
+        """Сохранить снимок итогов в JSON-файл."""
+        rows = [[*key, *astuple(totals)]
+                for key, totals in self.totals.items()]
+        import json
+
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as snapshot:
+            json.dump(rows, snapshot)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'TrainingAggregator':
+        """Восстановить итоги из снимка, сохранённого save()."""
+        import json
+
+        aggregator = cls()
+        with open(path, encoding='utf-8') as snapshot:
+            for *key, count, duration, distance, calories, speed_duration in (
+                    json.load(snapshot)):
+                aggregator.totals[tuple(key)] = Totals(
+                    count, duration, distance, calories, speed_duration
+                )
+        return aggregator
+
+
+class WorkoutStore:
+    """Результаты тренировок по спортсменам, упорядоченные по времени.
+
+    Выборка за период - O(log n) на поиск границ. Добавление в конец
+    истории - O(1), добавление задним числом вставляет запись на место
+    без перестроения индекса.
+    """
+
+    def __init__(self) -> None:
+        self._timestamps = {}
+        self._infos = {}
+
+    def __len__(self) -> int:
+        return sum(len(timestamps) for timestamps in self._timestamps.values())
+
+    def add(self, user, timestamp, info: InfoMessage | Training) -> None:
+        """Сохранить результат тренировки спортсмена user."""
+        if isinstance(info, Training):
+            info = info.show_training_info()
+        timestamps = self._timestamps.setdefault(user, [])
+        infos = self._infos.setdefault(user, [])
+        if not timestamps or timestamp >= timestamps[-1]:
+            timestamps.append(timestamp)
+            infos.append(info)
+        else:
+            index = bisect_right(timestamps, timestamp)
+            timestamps.insert(index, timestamp)
+            infos.insert(index, info)
+
+    def _bounds(self, user, start, end) -> tuple:
+        timestamps = self._timestamps.get(user, [])
+        low = 0 if start is None else bisect_left(timestamps, start)
+        high = (len(timestamps) if end is None
+                else bisect_left(timestamps, end))
+        return timestamps, self._infos.get(user, []), low, high
+
+    def range(self, user, start=None, end=None) -> list:
+        """Вернуть пары (время, результат) за период [start, end)."""
+        timestamps, infos, low, high = self._bounds(user, start, end)
+        return list(zip(timestamps[low:high], infos[low:high]))
+
+    def total(self, user, start=None, end=None,
+              name: str = 'calories') -> float:
+        """Сумма поля name результатов за период [start, end)."""
+        _, infos, low, high = self._bounds(user, start, end)
+        return sum(getattr(info, name) for info in infos[low:high])
+
+    def top(self, user, count: int, name: str = 'calories',
+            start=None, end=None) -> list:
+        """Вернуть count лучших пар (время, результат) по полю name."""
+        return heapq.nlargest(count, self.range(user, start, end),
+                              key=lambda item: getattr(item[1], name))
+
+
+def shard_worker(connection) -> None:
+    """Рабочий процесс: считать присланные части и вернуть итоги.
+
+    Для каждой части отправляются результаты compute_packages и итоги
+    Totals по видам тренировок.
+    """
+    with connection:
+        while (task := connection.recv()) is not None:
+            shard, packages = task
+            results = compute_packages(packages)
+            totals = {}
+            for row in results:
+                if row is not None:
+                    totals.setdefault(row[0], Totals()).add(InfoMessage(*row))
+            connection.send((shard, results, totals))
+
+
+def _shard_key(package: tuple):
+    return package[0]
+
+
+class _ShardPool:
+    """Рабочие процессы run_sharded и учёт неудачных попыток по частям.
+
+    С каждым процессом координатор связан своим каналом Pipe, поэтому
+    падение процесса в любой момент видно как EOFError на его конце.
+    """
+
+    def __init__(self, worker: Callable, workers: int, shards: int,
+                 retries: int, timeout: float = None) -> None:
+        self.worker = worker
+        self.workers = workers
+        self.retries = retries
+        self.timeout = timeout
+        self.failures = [0] * shards
+        self.todo = deque()
+        self.idle = []
+        self.busy = {}
+
+    def start(self) -> tuple:
+        """Запустить рабочий процесс; вернуть (соединение, процесс)."""
+        from multiprocessing import Pipe, Process
+
+        connection, child = Pipe()
+        process = Process(target=self.worker, args=(child,), daemon=True)
+        process.start()
+        child.close()
+        return connection, process
+
+    def fail(self, shard: int, connection, process) -> None:
+        """Остановить процесс и вернуть часть в начало очереди."""
+        connection.close()
+        process.kill()
+        process.join()
+        self.failures[shard] += 1
+        if self.failures[shard] > self.retries:
+            raise RuntimeError(f'Часть {shard} не обработана '
+                               f'за {self.retries + 1} попыток.')
+        self.todo.appendleft(shard)
+
+    def dispatch(self, send: Callable) -> None:
+        """Раздать части из очереди свободным или новым процессам."""
+        while self.todo and (self.idle or len(self.busy) < self.workers):
+            shard = self.todo.popleft()
+            connection, process = (self.idle.pop() if self.idle
+                                   else self.start())
+            try:
+                send(connection, shard)
+            except OSError:
+                self.fail(shard, connection, process)
+                continue
+            deadline = (None if self.timeout is None
+                        else perf_counter() + self.timeout)
+            self.busy[connection] = (shard, process, deadline)
+
+    def ready(self) -> list:
+        """Дождаться ответов; части с истёкшим сроком вернуть в очередь."""
+        from multiprocessing.connection import wait
+
+        if not self.busy:
+            return []
+        timeout = None
+        if self.timeout is not None:
+            timeout = max(0, min(deadline for _, _, deadline
+                                 in self.busy.values()) - perf_counter())
+        ready = wait(list(self.busy), timeout)
+        now = perf_counter()
+        for connection, (shard, process, deadline) in list(self.busy.items()):
+            if (connection not in ready and deadline is not None
+                    and deadline <= now):
+                del self.busy[connection]
+                self.fail(shard, connection, process)
+        return ready
+
+    def receive(self, connection) -> tuple | None:
+        """Принять ответ процесса; None, если процесс упал."""
+        shard, process, _ = self.busy.pop(connection)
+        try:
+            reply = connection.recv()
+        except (EOFError, OSError):
+            self.fail(shard, connection, process)
+            return None
+        self.idle.append((connection, process))
+        return reply
+
+    def close(self) -> None:
+        """Отпустить свободные процессы и остановить занятые."""
+        for connection, process in self.idle:
+            try:
+                connection.send(None)
+            except OSError:
+                process.kill()
+            connection.close()
+            process.join()
+        for connection, (_, process, _) in self.busy.items():
+            connection.close()
+            process.kill()
+            process.join()
+        self.idle, self.busy = [], {}
+
+
+def run_sharded(packages: Iterable[tuple], workers: int = 2,
+                shards: int = None, key: Callable = _shard_key,
+                retries: int = 2, worker: Callable = shard_worker,
+                timeout: float = None) -> tuple:
+    """Рассчитать пакеты частями в локальных рабочих процессах.
+
+    Пакеты делятся на shards частей по crc32 от key(package), по
+    умолчанию - по коду тренировки. Части раздаются не более чем workers
+    процессам через каналы Pipe; часть, чей процесс упал или не ответил
+    за timeout секунд, отдаётся новому процессу не более retries раз.
+    Возвращает результаты в исходном порядке и итоги по видам
+    тренировок, объединённые в порядке частей.
+    """
+    packages = list(packages)
+    shards = shards or workers
+    indexes = [[] for _ in range(shards)]
+    for index, package in enumerate(packages):
+        indexes[crc32(str(key(package)).encode()) % shards].append(index)
+    results = [None] * len(packages)
+    shard_totals = [{} for _ in range(shards)]
+
+    def send(connection, shard: int) -> None:
+        connection.send((shard, [packages[index]
+                                 for index in indexes[shard]]))
+
+    pool = _ShardPool(worker, workers, shards, retries, timeout)
+    pool.todo.extend(shard for shard in range(shards) if indexes[shard])
     try:
-        training_dict = {
-            'SWM': Swimming,
-            'RUN': Running,
-            'WLK': SportsWalking,
+        while pool.todo or pool.busy:
+            pool.dispatch(send)
+            for connection in pool.ready():
+                if (reply := pool.receive(connection)) is None:
+                    continue
+                shard, shard_results, shard_totals[shard] = reply
+                for index, row in zip(indexes[shard], shard_results):
+                    results[index] = row
+    finally:
+        pool.close()
+
+    totals = {}
+    for partial_totals in shard_totals:
+        for training_type, value in partial_totals.items():
+            totals.setdefault(training_type, Totals()).merge(value)
+    return results, totals
+
+
+class MicroBatcher:
+    """Расчёт пакетов, поступающих по одному, небольшими пачками.
+
+    Пачка считается, когда набралось batch_size пакетов или самый старый
+    пакет ждёт max_delay секунд. После каждой пачки batch_size
+    подстраивается: уменьшается вдвое, если p99 задержки последних
+    window пакетов выше target_p99, и понемногу растёт, если p99 ниже
+    половины цели.
+    """
+
+    def __init__(self, target_p99: float = 0.01, max_delay: float = 0.002,
+                 batch_size: int = 64, min_batch: int = 1,
+                 max_batch: int = 4096, window: int = 1000) -> None:
+        import threading
+
+        self.target_p99 = target_p99
+        self.max_delay = max_delay
+        self.batch_size = batch_size
+        self.min_batch = min_batch
+        self.max_batch = max_batch
+        self.flushes_by_size = 0
+        self.flushes_by_deadline = 0
+        self._latencies = deque(maxlen=window)
+        self._sorted_latencies = []
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> 'MicroBatcher':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def submit(self, workout_type: str, data: list):
+        """Поставить пакет в очередь; вернуть Future с InfoMessage."""
+        from concurrent.futures import Future
+
+        future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('MicroBatcher закрыт.')
+            if not self._thread.is_alive():
+                raise RuntimeError('Поток расчёта MicroBatcher остановлен.')
+            self._queue.append((perf_counter(), workout_type, data, future))
+            size = len(self._queue)
+            if size == 1 or size >= self.batch_size:
+                self._condition.notify()
+        return future
+
+    def get_p99(self) -> float:
+        """Вернуть p99 задержки последних пакетов в секундах."""
+        latencies = self._sorted_latencies
+        return latencies[int(0.99 * (len(latencies) - 1))] if latencies else 0
+
+    def _add_latency(self, latency: float) -> None:
+        """Добавить задержку в окно, сохраняя его отсортированную копию."""
+        window = self._latencies
+        if len(window) == window.maxlen:
+            oldest = window[0]
+            del self._sorted_latencies[bisect_left(self._sorted_latencies,
+                                                   oldest)]
+        window.append(latency)
+        insort(self._sorted_latencies, latency)
+
+    def get_stats(self) -> dict:
+        """Вернуть глубину очереди, размер пачки и счётчики сбросов."""
+        return {
+            'queue_depth': len(self._queue),
+            'batch_size': self.batch_size,
+            'flushes_by_size': self.flushes_by_size,
+            'flushes_by_deadline': self.flushes_by_deadline,
+            'p99': self.get_p99(),
         }
 
-        return training_dict.get(workout_type)(*data)
+    def close(self) -> None:
+        """Досчитать очередь и остановить поток расчёта."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def _take_batch(self) -> list:
+        with self._condition:
+            while not self._queue and not self._closed:
+                self._condition.wait()
+            if self._queue:
+                deadline = self._queue[0][0] + self.max_delay
+            while len(self._queue) < self.batch_size and not self._closed:
+                remaining = deadline - perf_counter()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            if len(self._queue) >= self.batch_size:
+                self.flushes_by_size += 1
+            elif self._queue:
+                self.flushes_by_deadline += 1
+            return [self._queue.popleft()
+                    for _ in range(min(self.batch_size, len(self._queue)))]
 
-    except TypeError:
-        print(f'{Bcolors.WARNING}[ERROR] В словаре не найден ключ '
-              f'тренировки: {workout_type}.')
+    def _run(self) -> None:
+        try:
+            while batch := self._take_batch():
+                self._run_batch(batch)
+        finally:
+            with self._condition:
+                self._closed = True
+                while self._queue:
+                    self._queue.popleft()[3].set_exception(
+                        RuntimeError('Поток расчёта MicroBatcher остановлен.')
+                    )
 
+    def _run_batch(self, batch: list) -> None:
+        results = []
+        for _, workout_type, data, _ in batch:
+            try:
+                training = read_package(workout_type, data)
+                if not isinstance(training, PackageError):
+                    training = training.show_training_info()
+            except Exception as error:
+                training = error
+            results.append(training)
+        now = perf_counter()
+        for (submitted, _, _, future), result in zip(batch, results):
+            self._add_latency(now - submitted)
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+        self._adapt()
 
-def main(training: Training) -> None:
+    def _adapt(self) -> None:
+        p99 = self.get_p99()
+        if p99 > self.target_p99:
+            self.batch_size = max(self.min_batch, self.batch_size // 2)
+        elif p99 < self.target_p99 / 2:
+            step = max(1, self.batch_size // 8)
+            self.batch_size = min(self.max_batch, self.batch_size + step)
+
+
+class PipelineStats:
+    """Счётчики и гистограммы задержек этапов обработки по видам тренировок.
+
+    Корзина гистограммы k содержит вызовы длительностью от 2**(k-1)
+    до 2**k наносекунд.
+    """
+
+    def __init__(self) -> None:
+        self.counts = {}
+        self.histograms = {}
+
+    def record(self, stage: str, training_type: str, elapsed: int) -> None:
+        """Учесть вызов этапа stage длительностью elapsed наносекунд."""
+        key = (stage, training_type)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = [0] * 64
+        histogram[min(elapsed.bit_length(), 63)] += 1
+
+    def reset(self) -> None:
+        """Обнулить накопленную статистику."""
+        self.counts.clear()
+        self.histograms.clear()
+
+
+STATS = PipelineStats()
+_ORIGINALS = {}
+
+
+def _timed(stage: str, func, get_type):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = perf_counter_ns()
+        result = func(*args, **kwargs)
+        STATS.record(stage, get_type(args, kwargs, result),
+                     perf_counter_ns() - start)
+        return result
+    return wrapper
+
+
+def enable_instrumentation() -> None:
+    """Включить замеры read_package, show_training_info и get_message.
+
+    Функции подменяются обёртками с замером времени, поэтому в
+    выключенном состоянии замеры ничего не стоят. Ссылки, полученные
+    через `from homework import read_package` до включения, остаются
+    без замеров.
+    """
+    if _ORIGINALS:
+        return
+    _ORIGINALS['read_package'] = read_package
+    _ORIGINALS['show_training_info'] = Training.show_training_info
+    _ORIGINALS['get_message'] = InfoMessage.get_message
+    globals()['read_package'] = _timed(
+        'read_package', read_package,
+        lambda args, kwargs, result: (args[0] if args
+                                      else kwargs['workout_type'])
+    )
+    Training.show_training_info = _timed(
+        'show_training_info', Training.show_training_info,
+        lambda args, kwargs, result: result.training_type
+    )
+    InfoMessage.get_message = _timed(
+        'get_message', InfoMessage.get_message,
+        lambda args, kwargs, result: args[0].training_type
+    )
+
+
+def disable_instrumentation() -> None:
+    """Выключить замеры, вернув исходные функции."""
+    if not _ORIGINALS:
+        return
+    globals()['read_package'] = _ORIGINALS.pop('read_package')
+    Training.show_training_info = _ORIGINALS.pop('show_training_info')
+    InfoMessage.get_message = _ORIGINALS.pop('get_message')
+
+
+def profile_batch(packages: Iterable[tuple], sort: str = 'cumulative',
+                  limit: int = 20) -> str:
+    """Рассчитать пакеты под cProfile и вернуть отчёт pstats."""
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.runcall(compute_packages, packages)
+    report = io.StringIO()
+    pstats.Stats(profiler, stream=report).sort_stats(sort).print_stats(limit)
+    return report.getvalue()
+
+
+def main(training: Training | PackageError) -> None:
     """Главная функция."""
+    if isinstance(training, PackageError):
+        print(f'{Bcolors.WARNING}{training.get_message()}{Bcolors.ENDC}')
+        return
+    print(training.show_training_info().get_message())
+
+
+DEMO_PACKAGES = [
+    ('SWM', [720, 1, 80, 25, 40]),
+    ('RUN', [15000, 1, 75]),
+    ('WLK', [9000, 1, 75, 180]),
+]
+
+
+def serve_worker(path: str) -> None:
+    """Держать тёплый процесс, обслуживающий клиентов на Unix-сокете."""
+    import asyncio
+
+    bound = False
+
+    async def serve() -> None:
+        nonlocal bound
+        server = await start_server(path=path)
+        bound = True
+        async with server:
+            await server.serve_forever()
+
     try:
-        print(training.show_training_info().get_message())
-    except AttributeError:
-        print(f'[ERROR] Невозможно создать объект для {workout_type}.')
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Удаляем только сокет, созданный этим процессом: если путь
+        # занят чужим файлом, start_server падает до bound = True.
+        if bound and os.path.exists(path):
+            os.unlink(path)
 
 
-if __name__ == '__main__':
-    packages = [
-        ('SWM', [720, 1, 80, 25, 40]),
-        ('RUN', [15000, 1, 75]),
-        ('WLK', [9000, 1, 75, 180]),
-    ]
+def cli(argv: list = None) -> int:
+    """Точка входа командной строки."""
+    import argparse
 
-    for workout_type, data in packages:
-        training = read_package(workout_type, data)
-        main(training)
+    parser = argparse.ArgumentParser(description='Модуль фитнес-трекера.')
+    parser.add_argument('input', nargs='?', default='-',
+                        help='файл с пакетами по одному на строку, '
+                             '- для stdin')
+    parser.add_argument('--chunk-size', type=int, default=1000,
+                        help='число пакетов, обрабатываемых за раз')
+    parser.add_argument('--demo', action='store_true',
+                        help='рассчитать демонстрационные пакеты')
+    parser.add_argument('--serve', metavar='SOCKET',
+                        help='запустить тёплый рабочий процесс')
+    parser.add_argument('--connect', metavar='SOCKET',
+                        help='передать пакеты рабочему процессу; быстрее '
+                             'то же делает python homework_client.py '
+                             'SOCKET [INPUT]')
+    args = parser.parse_args(argv)
+
+    if args.demo:
+        for workout_type, data in DEMO_PACKAGES:
+            main(read_package(workout_type, data))
+    elif args.serve:
+        serve_worker(args.serve)
+    elif args.connect:
+        from homework_client import main as client_main
+
+        return client_main([args.connect, args.input])
+    elif args.input == '-':
+        run_stream(sys.stdin, sys.stdout, args.chunk_size)
+    else:
+        with open(args.input) as infile:
+            run_stream(infile, sys.stdout, args.chunk_size)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(cli())
@@ -0,0 +1,51 @@
+"""Клиент тёплого рабочего процесса homework.py.
+
+Модуль не импортирует homework.py и почти ничего из стандартной
+библиотеки, поэтому запускается быстрее прямого расчёта:
+
+    python homework.py --serve /tmp/homework.sock
+    python homework_client.py /tmp/homework.sock packages.txt
+"""
+import io
+import socket
+import sys
+import threading
+from functools import partial
+
+
+def send_to_worker(path: str, infile: io.BufferedIOBase,
+                   outfile: io.BufferedIOBase) -> None:
+    """Передать пакеты рабочему процессу и вывести его ответы."""
+    with socket.socket(socket.AF_UNIX) as sock:
+        sock.connect(path)
+
+        def send() -> None:
+            for chunk in iter(partial(infile.read, 65536), b''):
+                sock.sendall(chunk)
+            sock.shutdown(socket.SHUT_WR)
+
+        sender = threading.Thread(target=send, daemon=True)
+        sender.start()
+        for chunk in iter(partial(sock.recv, 65536), b''):
+            outfile.write(chunk)
+        sender.join()
+    outfile.flush()
+
+
+def main(argv: list = None) -> int:
+    """Точка входа: SOCKET [INPUT], без INPUT или с - пакеты из stdin."""
+    argv = sys.argv[1:] if argv is None else argv
+    if not 1 <= len(argv) <= 2:
+        print('usage: homework_client.py SOCKET [INPUT]', file=sys.stderr)
+        return 2
+    path, source = argv[0], argv[1] if len(argv) == 2 else '-'
+    if source == '-':
+        send_to_worker(path, sys.stdin.buffer, sys.stdout.buffer)
+    else:
+        with open(source, 'rb') as infile:
+            send_to_worker(path, infile, sys.stdout.buffer)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
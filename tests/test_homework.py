@@ -2,6 +2,7 @@ import re
 import pytest
 import types
 import inspect
+from io import StringIO
 from conftest import Capturing
 
 try:
@@ -363,3 +364,921 @@ def test_main_output(input_data, expected):
     assert get_message_output == expected, (
         'Метод `main` должен печатать результат в консоль.\n'
     )
+
+
+@pytest.mark.parametrize('workout_type, rows', [
+    ('SWM', [[720, 1, 80, 25, 40], [420, 4, 20, 42, 4],
+             [1206, 12, 6, 12, 6]]),
+    ('RUN', [[9000, 1, 75], [420, 4, 20], [1206, 12, 6]]),
+    ('WLK', [[9000, 1, 75, 180], [420, 4, 20, 42], [1206, 12, 6, 12]]),
+])
+def test_read_batch(workout_type, rows):
+    columns = [list(column) for column in zip(*rows)]
+    result = homework.read_batch(workout_type, columns)
+    assert len(result) == len(rows), (
+        'Функция `read_batch` должна вернуть результат для каждой строки.'
+    )
+    expected = [
+        homework.read_package(workout_type, data).show_training_info()
+        for data in rows
+    ]
+    assert list(result) == expected, (
+        'Результаты `read_batch` должны совпадать с расчётом '
+        'через `show_training_info`.'
+    )
+
+
+def test_run_stream():
+    infile = StringIO(
+        'SWM 720 1 80 25 40\n'
+        '\n'
+        'RUN 1206 12 6\n'
+        'RUN x 1 75\n'
+        'WLK 1e200 1 75 180\n'
+        'WLK 9000 1 75 180\n'
+    )
+    outfile = StringIO()
+    count = homework.run_stream(infile, outfile, chunk_size=2)
+    assert count == 5, (
+        'Функция `run_stream` должна вернуть количество сообщений.'
+    )
+    lines = outfile.getvalue().splitlines()
+    lines[3] = lines[3].partition(':')[0]
+    assert lines == [
+        'Тип тренировки: Swimming; '
+        'Длительность: 1.000 ч.; '
+        'Дистанция: 0.994 км; '
+        'Ср. скорость: 1.000 км/ч; '
+        'Потрачено ккал: 336.000.',
+        'Тип тренировки: Running; '
+        'Длительность: 12.000 ч.; '
+        'Дистанция: 0.784 км; '
+        'Ср. скорость: 0.065 км/ч; '
+        'Потрачено ккал: -81.320.',
+        '[ERROR] Некорректный пакет: RUN x 1 75',
+        '[ERROR] Ошибка расчёта пакета WLK 1e+200 1 75 180',
+        'Тип тренировки: SportsWalking; '
+        'Длительность: 1.000 ч.; '
+        'Дистанция: 5.850 км; '
+        'Ср. скорость: 5.850 км/ч; '
+        'Потрачено ккал: 157.500.',
+    ], (
+        'Функция `run_stream` должна записывать сообщения построчно, '
+        'а вместо некорректных строк и ошибок расчёта - текст ошибки.'
+    )
+
+
+@pytest.mark.parametrize('workers, chunk_size', [
+    (1, 10000),
+    (2, 1),
+])
+def test_process_parallel(workers, chunk_size):
+    packages = [
+        ('SWM', [720, 1, 80, 25, 40]),
+        ('RUN', [15000, 1, 75]),
+        ('XXX', [1, 2, 3]),
+        ('WLK', [9000, 1, 75, 180]),
+    ] * 3
+    with Capturing():
+        result = homework.process_parallel(
+            packages, workers=workers, chunk_size=chunk_size
+        )
+        expected = homework.compute_packages(packages)
+    assert result == expected, (
+        'Функция `process_parallel` должна сохранять порядок пакетов.'
+    )
+    assert result[2] is None, (
+        'Для неизвестного кода тренировки результатом должен быть None.'
+    )
+    info = homework.read_package(*packages[0]).show_training_info()
+    assert result[0] == (info.training_type, info.duration, info.distance,
+                         info.speed, info.calories), (
+        'Функция `process_parallel` должна возвращать поля `InfoMessage`.'
+    )
+
+
+def test_InfoMessage_slots():
+    info_message = homework.InfoMessage('Running', 1, 2, 3, 4)
+    assert not hasattr(info_message, '__dict__'), (
+        'Объекты `InfoMessage` не должны хранить `__dict__`.'
+    )
+
+
+@pytest.mark.parametrize('training_cls, rows', [
+    (homework.Swimming, [[720, 1, 80, 25, 40], [420, 4, 20, 42, 4]]),
+    (homework.Running, [[9000, 1, 75], [1206, 12, 6]]),
+    (homework.SportsWalking, [[9000, 1, 75, 180], [420, 4, 20, 42]]),
+])
+def test_TrainingArray(training_cls, rows):
+    training_array = homework.TrainingArray(training_cls, rows)
+    assert len(training_array) == len(rows)
+    for row, data in zip(training_array, rows):
+        training = training_cls(*data)
+        assert row.get_spent_calories() == training.get_spent_calories(), (
+            'Строки `TrainingArray` должны считать калории так же, '
+            'как объекты тренировок.'
+        )
+        assert row.show_training_info() == training.show_training_info()
+    assert training_array[-1].action == rows[-1][0]
+    with pytest.raises(TypeError):
+        training_array.append([1, 2])
+
+
+def test_TrainingArray_memory():
+    import tracemalloc
+    rows = [[9000 + i, 1, 75, 180] for i in range(10000)]
+    tracemalloc.start()
+    trainings = [homework.SportsWalking(*data) for data in rows]
+    objects_size = tracemalloc.get_traced_memory()[0]
+    del trainings
+    tracemalloc.stop()
+    tracemalloc.start()
+    training_array = homework.TrainingArray(homework.SportsWalking, rows)
+    array_size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert len(training_array) == len(rows)
+    assert array_size * 2 < objects_size, (
+        '`TrainingArray` должен занимать заметно меньше памяти, '
+        'чем список объектов.'
+    )
+
+
+def test_render_many():
+    messages = [
+        homework.InfoMessage('Swimming', 1, 75, 1, 80),
+        homework.InfoMessage('Running', 12, 0.7839, 0.065325, -81.320328),
+        homework.InfoMessage('SportsWalking', 1.5, 5.85, 3.9, 157.5),
+    ]
+    out = StringIO()
+    count = homework.render_many(messages, out, chunk_size=2)
+    assert count == len(messages)
+    assert out.getvalue() == ''.join(
+        message.get_message() + '\n' for message in messages
+    ), (
+        'Функция `render_many` должна выводить то же, что `get_message`.'
+    )
+
+
+def test_Training_get_distance_after_change():
+    running = homework.Running(15000, 1, 75)
+    assert running.get_distance() == 9.75
+    running.action = 30000
+    assert running.get_distance() == 19.5, (
+        'Дистанция должна учитывать изменённые данные тренировки.'
+    )
+    assert running.show_training_info().distance == 19.5
+
+
+def test_TrainingInfoCache():
+    cache = homework.TrainingInfoCache(maxsize=2)
+    first = cache.get_info('RUN', [15000, 1, 75])
+    assert first == homework.Running(15000, 1, 75).show_training_info()
+    assert cache.get_info('RUN', (15000, 1, 75)) is first
+    cache.get_info('WLK', [9000, 1, 75, 180])
+    cache.get_info('RUN', [15000, 1, 75])
+    cache.get_info('SWM', [720, 1, 80, 25, 40])
+    assert (cache.hits, cache.misses, cache.evictions) == (2, 3, 1), (
+        'Проверьте счётчики попаданий, промахов и вытеснений кэша.'
+    )
+    assert cache.get_info('RUN', [15000, 1, 75]) is first, (
+        'Кэш должен вытеснять давно не использованные пакеты.'
+    )
+    cache.resize(1)
+    assert len(cache) == 1 and cache.evictions == 2
+    cache.clear()
+    assert len(cache) == 0 and cache.hits == 0
+
+
+def test_start_server():
+    import asyncio
+
+    async def scenario():
+        server = await homework.start_server(batch_size=2, queue_size=2)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(
+            b'SWM 720 1 80 25 40\n'
+            b'RUN 1206 12 6\n'
+            b'RUN 1 x\n'
+            b'RUN 15000 0 75\n'
+            b'RUN \xff 1 75\n'
+            b'WLK 9000 1 75 180\n'
+        )
+        writer.write_eof()
+        answer = await reader.read()
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return answer.decode().splitlines()
+
+    answer = asyncio.run(scenario())
+    assert len(answer) == 6, 'Сервер должен ответить на каждую строку.'
+    assert answer[0] == homework.read_package(
+        'SWM', [720, 1, 80, 25, 40]
+    ).show_training_info().get_message()
+    assert answer[2].startswith('[ERROR]')
+    assert answer[3].startswith('[ERROR]'), (
+        'Ошибка расчёта должна давать строку с ошибкой, а не разрыв '
+        'соединения.'
+    )
+    assert answer[4].startswith('[ERROR]'), (
+        'Строка не в UTF-8 должна давать строку с ошибкой.'
+    )
+    assert answer[5].startswith('Тип тренировки: SportsWalking;')
+
+
+def test_serve_worker_keeps_foreign_file(tmp_path):
+    path = tmp_path / 'notes.txt'
+    path.write_text('заметки')
+    with pytest.raises(OSError):
+        homework.serve_worker(str(path))
+    assert path.read_text() == 'заметки', (
+        'Рабочий процесс не должен удалять файл, который он не создавал.'
+    )
+
+
+def test_send_to_worker(tmp_path):
+    import asyncio
+    import threading
+    from io import BytesIO
+
+    import homework_client
+
+    path = str(tmp_path / 'worker.sock')
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(homework.start_server(path=path))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        outfile = BytesIO()
+        homework_client.send_to_worker(
+            path, BytesIO(b'RUN 15000 1 75\nRUN x\n'), outfile
+        )
+    finally:
+        loop.call_soon_threadsafe(server.close)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+    assert outfile.getvalue().decode().splitlines() == [
+        homework.read_package(
+            'RUN', [15000, 1, 75]
+        ).show_training_info().get_message(),
+        '[ERROR] Некорректный пакет: RUN x',
+    ], 'Клиент должен вывести ответ рабочего процесса на каждую строку.'
+
+
+def test_read_lines_cancel():
+    import asyncio
+
+    async def scenario():
+        queue = asyncio.Queue(maxsize=1)
+        reader = asyncio.StreamReader()
+        reader.feed_data(b'RUN 15000 1 75\nRUN 15000 1 75\n')
+        reading = asyncio.create_task(homework._read_lines(reader, queue))
+        while not queue.full():
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        reading.cancel()
+        await asyncio.wait([reading], timeout=1)
+        return reading.done()
+
+    assert asyncio.run(scenario()), (
+        'Отменённое чтение не должно ждать места в заполненной очереди.'
+    )
+
+
+@pytest.mark.parametrize('input_data, expected', [
+    (('XXX', [1, 2, 3]),
+     '[ERROR] В словаре не найден ключ тренировки: XXX.'),
+    (('RUN', [1, 2]),
+     '[ERROR] Running ожидает 3 значений, получено 2.'),
+])
+def test_read_package_error(input_data, expected):
+    with Capturing() as output:
+        result = homework.read_package(*input_data)
+    assert output == [], 'Функция `read_package` не должна ничего печатать.'
+    assert isinstance(result, homework.PackageError), (
+        'Для некорректного пакета `read_package` должна вернуть '
+        '`PackageError`.'
+    )
+    assert result.get_message() == expected
+    columns = [[value] for value in input_data[1]]
+    assert homework.read_batch(input_data[0], columns) == result, (
+        'Для некорректных колонок `read_batch` должна вернуть '
+        '`PackageError`.'
+    )
+
+
+@pytest.mark.parametrize('input_data, expected', [
+    (('RUN', [1, 'x', 75]),
+     '[ERROR] Running: нечисловое значение в пакете.'),
+    (('RUN', [15000, 0, 75]),
+     '[ERROR] Running: поля duration не могут быть равны нулю.'),
+    (('WLK', [9000, 1, 75, 0]),
+     '[ERROR] SportsWalking: поля duration, height не могут быть '
+     'равны нулю.'),
+])
+def test_read_package_bad_values(input_data, expected):
+    result = homework.read_package(*input_data)
+    assert isinstance(result, homework.PackageError), (
+        '`read_package` должна проверять значения пакета.'
+    )
+    assert result.get_message() == expected
+    assert homework.read_packages([input_data])[0] == result
+
+
+def test_register_training(monkeypatch):
+    monkeypatch.setattr(homework, '_TRAINING_TYPES',
+                        dict(homework._TRAINING_TYPES))
+
+    class Rowing(homework.Running):
+        pass
+
+    homework.register_training('ROW', Rowing)
+    result = homework.read_package('ROW', [15000, 1, 75])
+    assert isinstance(result, Rowing), (
+        '`read_package` должна использовать зарегистрированные классы.'
+    )
+
+
+def test_instrumentation():
+    read_package = homework.read_package
+    homework.STATS.reset()
+    homework.enable_instrumentation()
+    try:
+        with Capturing():
+            homework.main(homework.read_package('RUN', [15000, 1, 75]))
+            homework.main(homework.read_package('XXX', [1]))
+            homework.read_package(workout_type='WLK',
+                                  data=[9000, 1, 75, 180])
+        homework.run_stream(StringIO('SWM 720 1 80 25 40\n'), StringIO())
+    finally:
+        homework.disable_instrumentation()
+    assert homework.read_package is read_package, (
+        'После выключения замеров должна вернуться исходная функция.'
+    )
+    assert homework.STATS.counts == {
+        ('read_package', 'RUN'): 1,
+        ('read_package', 'XXX'): 1,
+        ('read_package', 'SWM'): 1,
+        ('read_package', 'WLK'): 1,
+        ('show_training_info', 'Running'): 1,
+        ('show_training_info', 'Swimming'): 1,
+        ('get_message', 'Running'): 1,
+        ('get_message', 'Swimming'): 1,
+    }
+    assert sum(homework.STATS.histograms[('read_package', 'RUN')]) == 1
+    with Capturing():
+        homework.main(homework.read_package('RUN', [15000, 1, 75]))
+    assert len(homework.STATS.counts) == 8, (
+        'Выключенные замеры не должны обновлять статистику.'
+    )
+
+
+def test_profile_batch():
+    report = homework.profile_batch([('RUN', [15000, 1, 75])] * 10)
+    assert 'show_training_info' in report
+
+
+def test_TrainingAggregator(tmp_path):
+    from datetime import date
+    monday, wednesday = date(2026, 10, 12), date(2026, 10, 14)
+    first = homework.TrainingAggregator()
+    first.add('anna', monday, homework.Running(15000, 1, 75))
+    first.add('anna', wednesday, homework.SportsWalking(9000, 1, 75, 180))
+    second = homework.TrainingAggregator()
+    second.add('anna', wednesday, homework.Running(9000, 2, 75))
+    first.merge(second)
+
+    week = first.get('anna', 'Running', 'week', wednesday)
+    assert week.count == 2, 'Итоги недели должны включать обе пробежки.'
+    assert week.distance == 9.75 + 5.85
+    assert week.get_mean_speed() == (9.75 * 1 + 2.925 * 2) / 3
+    assert first.get('anna', 'Running', 'day', monday).count == 1
+    assert first.get('anna', 'Swimming').count == 0
+
+    path = tmp_path / 'totals.json'
+    first.save(path)
+    restored = homework.TrainingAggregator.load(path)
+    assert restored.totals == first.totals, (
+        'Снимок итогов должен восстанавливаться без потерь.'
+    )
+
+    first.add('anna', monday, homework.Swimming(720, 1, 80, 25, 40))
+    assert first.get('anna', 'Swimming').get_mean_speed() == 1.0, (
+        'Средняя скорость должна совпадать со скоростью тренировок, '
+        'в том числе плавания.'
+    )
+
+
+def test_PackageFile(tmp_path):
+    rows = {
+        'SWM': [[720, 1, 80, 25, 40], [420, 4, 20, 42, 4]],
+        'RUN': [[9000, 1, 75], [1206, 12, 6], [420, 4, 20]],
+    }
+    path = tmp_path / 'packages.bin'
+    with open(path, 'wb') as out:
+        for workout_type, data in rows.items():
+            homework.write_binary(out, workout_type, list(zip(*data)))
+    with homework.PackageFile(path) as package_file:
+        assert [code for code, _ in package_file.sections] == ['SWM', 'RUN']
+        for batch, (workout_type, data) in zip(
+                package_file.show_batch_info(), rows.items()):
+            expected = [
+                homework.read_package(workout_type, values)
+                .show_training_info()
+                for values in data
+            ]
+            assert list(batch) == expected, (
+                'Расчёт по двоичному файлу должен совпадать с расчётом '
+                'по пакетам.'
+            )
+    with pytest.raises(ValueError):
+        homework.write_binary(StringIO(), 'RUN', [[1], [2]])
+
+    path.write_bytes(path.read_bytes()[:-16])
+    with pytest.raises(ValueError):
+        homework.PackageFile(path)
+
+
+def test_write_binary_code(monkeypatch):
+    monkeypatch.setattr(homework, '_TRAINING_TYPES',
+                        dict(homework._TRAINING_TYPES))
+    homework.register_training('BIKE', homework.Running)
+    with pytest.raises(ValueError):
+        homework.write_binary(StringIO(), 'BIKE', [[1], [1], [1]])
+
+
+@pytest.mark.parametrize('input_data', [
+    ('SWM', [720, 1, 80, 25, 40]),
+    ('RUN', [1206, 12, 6]),
+    ('WLK', [9000, 1, 75, 180]),
+])
+def test_LazyInfoMessage(input_data):
+    training = homework.read_package(*input_data)
+    lazy = training.show_lazy_info()
+    info = homework.read_package(*input_data).show_training_info()
+    assert lazy.calories == info.calories
+    assert lazy.get_message() == info.get_message(), (
+        'Ленивое сообщение должно выводиться так же, как `InfoMessage`.'
+    )
+    assert lazy.to_info() == info
+
+
+def test_LazyInfoBatch(monkeypatch):
+    columns = [[720, 420], [1, 4], [80, 20], [25, 42], [40, 4]]
+
+    def fail(*args):
+        raise AssertionError('Дистанция не нужна для расчёта калорий.')
+
+    monkeypatch.setattr(homework.Swimming, 'get_batch_distance', fail)
+    lazy = homework.LazyInfoBatch(homework.Swimming, columns)
+    assert lazy.calories == [336.0, 45.68000000000001]
+    monkeypatch.undo()
+    assert list(lazy) == list(homework.read_batch('SWM', columns))
+
+
+def test_cli(tmp_path):
+    path = tmp_path / 'packages.txt'
+    path.write_text('RUN 15000 1 75\nXXX 1\n', encoding='utf-8')
+    with Capturing() as output:
+        assert homework.cli([str(path)]) == 0
+    assert output == [
+        homework.Running(15000, 1, 75).show_training_info().get_message(),
+        '[ERROR] В словаре не найден ключ тренировки: XXX.',
+    ], 'CLI должен выводить по строке на каждый пакет.'
+    with Capturing() as output:
+        homework.cli(['--demo'])
+    assert len(output) == len(homework.DEMO_PACKAGES)
+
+
+def test_export():
+    packages = [
+        ('RUN', [15000, 1, 75]),
+        ('SWM', [720, 1, 80, 25, 40]),
+        ('RUN', [1]),
+        ('RUN', [1206, 12, 6]),
+        ('RUN', [15000, 0, 75]),
+    ]
+    errors = []
+    batches = list(homework.iter_batches(packages, chunk_size=3,
+                                         errors=errors))
+    assert [batch.training_type for batch in batches] == [
+        'Running', 'Swimming', 'Running'
+    ], 'Некорректные пакеты должны пропускаться.'
+    assert [index for index, _ in errors] == [2, 4], (
+        'Пропущенные пакеты должны сообщаться с номерами строк.'
+    )
+    assert [batch.index for batch in batches] == [[0], [1], [3]]
+
+    out = StringIO()
+    assert homework.write_csv(batches, out) == 3
+    lines = out.getvalue().splitlines()
+    assert lines[0] == (
+        'index,training_type,duration,distance,speed,calories'
+    )
+    index, training_type, *values = lines[1].split(',')
+    info = homework.Running(15000, 1, 75).show_training_info()
+    assert (index, training_type) == ('0', 'Running')
+    assert [float(value) for value in values] == [
+        info.duration, info.distance, info.speed, info.calories
+    ], 'CSV должен сохранять значения без потери точности.'
+
+    columns = homework.export_columns(batches)
+    assert list(columns['index']) == [0, 1, 3]
+    assert columns['training_type'] == ['Running', 'Swimming', 'Running']
+    assert list(columns['calories']) == [
+        info.calories, 336.0, -81.32032799999999
+    ]
+
+
+def test_TrainingService(monkeypatch):
+    import threading
+    import time
+
+    calls = []
+    show_training_info = homework.Training.show_training_info
+
+    def slow_show_training_info(self):
+        calls.append(self)
+        time.sleep(0.05)
+        return show_training_info(self)
+
+    monkeypatch.setattr(homework.Training, 'show_training_info',
+                        slow_show_training_info)
+    with homework.TrainingService(max_workers=4) as service:
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                service.get_info('RUN', [15000, 1, 75])
+            ))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(calls) == 1, (
+            'Одинаковые пакеты должны рассчитываться один раз.'
+        )
+        assert all(result is results[0] for result in results)
+        many = service.get_many([
+            ('RUN', [15000, 1, 75]),
+            ('WLK', [9000, 1, 75, 180]),
+            ('XXX', [1]),
+        ])
+    assert many[0] is results[0]
+    assert many[1] == homework.SportsWalking(
+        9000, 1, 75, 180
+    ).show_training_info()
+    assert isinstance(many[2], homework.PackageError)
+
+
+def test_TrainingService_maxsize():
+    with homework.TrainingService(maxsize=2) as service:
+        first = service.get_info('RUN', [15000, 1, 75])
+        service.get_info('RUN', [9000, 1, 75])
+        service.get_info('RUN', [1206, 12, 6])
+        assert len(service) == 2 and service.evictions == 1, (
+            'Хранилище не должно превышать maxsize результатов.'
+        )
+        assert service.get_info('RUN', [15000, 1, 75]) is not first
+
+
+def test_TrainingService_clear_lock():
+    import threading
+
+    service = homework.TrainingService()
+    service.get_info('RUN', [15000, 1, 75])
+    with service._lock:
+        clearing = threading.Thread(target=service.clear)
+        clearing.start()
+        clearing.join(timeout=0.1)
+        assert len(service) == 1, (
+            'clear() должен ждать блокировку хранилища.'
+        )
+    clearing.join(timeout=5)
+    assert len(service) == 0
+
+
+@pytest.mark.parametrize('input_data', [
+    ('SWM', [720, 1, 80, 25, 40]),
+    ('SWM', [1206, 12, 6, 12, 6]),
+    ('RUN', [420, 4, 20]),
+    ('WLK', [1206, 12, 6, 12]),
+])
+def test_Training_kernel(input_data):
+    training = homework.read_package(*input_data)
+    assert training._kernel is not None
+    assert training.show_training_info() == homework.InfoMessage(
+        training.__class__.__name__, training.duration,
+        training.get_distance(), training.get_mean_speed(),
+        training.get_spent_calories()
+    ), 'Ядро расчёта должно давать те же значения, что и методы.'
+
+
+def test_Training_kernel_subclass():
+    from dataclasses import dataclass, field
+    from typing import ClassVar
+
+    @dataclass
+    class Rowing(homework.Running):
+        LEN_STEP: ClassVar[float] = field(default=2.5, init=False)
+
+    class Jogging(homework.Running):
+        def get_spent_calories(self):
+            return 1.0
+
+    rowing = Rowing(1000, 1, 75)
+    assert rowing.show_training_info().distance == 2.5, (
+        'Ядро должно учитывать LEN_STEP подкласса.'
+    )
+    assert Jogging._kernel is None, (
+        'Ядро не должно использоваться при переопределённых методах.'
+    )
+    assert Jogging(1000, 1, 75).show_training_info().calories == 1.0
+
+
+def test_Training_kernel_instance_override(monkeypatch):
+    training = homework.Running(1000, 1, 75)
+    monkeypatch.setattr(training, 'get_spent_calories', lambda: 1.0)
+    assert training.show_training_info().calories == 1.0, (
+        'Переопределённый у объекта метод должен использоваться '
+        'вместо ядра.'
+    )
+
+
+def _kernel_and_methods(training):
+    info = training.show_training_info()
+    return ((info.distance, info.speed, info.calories),
+            (training.get_distance(), training.get_mean_speed(),
+             training.get_spent_calories()))
+
+
+def test_Training_kernel_constants(monkeypatch):
+    monkeypatch.setattr(homework.Running, 'LEN_STEP', 1.0)
+    kernel, methods = _kernel_and_methods(homework.Running(1000, 1, 75))
+    assert kernel == methods and kernel[0] == 1.0, (
+        'Ядро должно учитывать изменённую константу класса.'
+    )
+    monkeypatch.setattr(homework.Training, 'M_IN_KM', 100)
+    for training in (homework.Running(1000, 1, 75),
+                     homework.SportsWalking(9000, 1, 75, 180),
+                     homework.Swimming(720, 1, 80, 25, 40)):
+        kernel, methods = _kernel_and_methods(training)
+        assert kernel == methods, (
+            'Ядро подкласса должно учитывать изменённую константу '
+            'базового класса.'
+        )
+    training = homework.Running(1000, 1, 75)
+    training.RUN_COEF_FIRST = 0
+    kernel, methods = _kernel_and_methods(training)
+    assert kernel == methods, (
+        'Переопределённая у объекта константа должна учитываться.'
+    )
+
+
+def _first_run(name):
+    import os
+
+    flag = f"{os.environ['FLAKY_WORKER_FLAG']}.{name}"
+    if os.path.exists(flag):
+        return False
+    open(flag, 'w').close()
+    return True
+
+
+def _flaky_shard_worker(connection):
+    import os
+
+    if _first_run('flaky'):
+        connection.recv()
+        os._exit(1)
+    homework.shard_worker(connection)
+
+
+def _early_exit_shard_worker(connection):
+    import os
+
+    if _first_run('early_exit'):
+        os._exit(1)
+    homework.shard_worker(connection)
+
+
+def _hung_shard_worker(connection):
+    import time
+
+    if _first_run('hung'):
+        connection.recv()
+        time.sleep(60)
+    homework.shard_worker(connection)
+
+
+def _dead_shard_worker(connection):
+    import os
+    os._exit(1)
+
+
+SHARD_WORKERS = {
+    'shard_worker': homework.shard_worker,
+    'flaky': _flaky_shard_worker,
+    'early_exit': _early_exit_shard_worker,
+}
+
+
+@pytest.mark.parametrize('worker', list(SHARD_WORKERS))
+def test_run_sharded(worker, tmp_path, monkeypatch):
+    monkeypatch.setenv('FLAKY_WORKER_FLAG', str(tmp_path / 'flag'))
+    packages = [
+        ('SWM', [720, 1, 80, 25, 40]),
+        ('RUN', [15000, 1, 75]),
+        ('XXX', [1]),
+        ('WLK', [9000, 1, 75, 180]),
+        ('RUN', [1206, 12, 6]),
+    ]
+    results, totals = homework.run_sharded(
+        packages, workers=2, shards=3,
+        worker=SHARD_WORKERS[worker]
+    )
+    assert results == homework.compute_packages(packages), (
+        'Результаты должны возвращаться в исходном порядке.'
+    )
+    assert totals['Running'].count == 2
+    assert totals['Running'].calories == (
+        homework.Running(15000, 1, 75).get_spent_calories()
+        + homework.Running(1206, 12, 6).get_spent_calories()
+    )
+
+
+def test_run_sharded_dead_worker():
+    with pytest.raises(RuntimeError):
+        homework.run_sharded([('RUN', [15000, 1, 75])], workers=1,
+                             retries=1, worker=_dead_shard_worker)
+
+
+def test_run_sharded_timeout(tmp_path, monkeypatch):
+    from time import perf_counter
+
+    monkeypatch.setenv('FLAKY_WORKER_FLAG', str(tmp_path / 'flag'))
+    start = perf_counter()
+    results, _ = homework.run_sharded([('RUN', [15000, 1, 75])], workers=1,
+                                      worker=_hung_shard_worker,
+                                      timeout=0.5)
+    assert perf_counter() - start < 10, (
+        'Зависший процесс должен останавливаться по истечении timeout.'
+    )
+    assert results == homework.compute_packages([('RUN', [15000, 1, 75])])
+
+
+def test_WorkoutStore():
+    from datetime import datetime
+    store = homework.WorkoutStore()
+    runs = {
+        datetime(2026, 10, 1, 8): homework.Running(15000, 1, 75),
+        datetime(2026, 10, 3, 8): homework.Running(9000, 1, 75),
+        datetime(2026, 10, 2, 8): homework.SportsWalking(9000, 1, 75, 180),
+        datetime(2026, 10, 5, 8): homework.Running(1206, 12, 6),
+    }
+    for timestamp, training in runs.items():
+        store.add('anna', timestamp, training)
+    store.add('boris', datetime(2026, 10, 2), homework.Running(1, 1, 1))
+    assert len(store) == 5
+
+    result = store.range('anna', datetime(2026, 10, 2), datetime(2026, 10, 5))
+    assert [timestamp.day for timestamp, _ in result] == [2, 3], (
+        'Выборка должна быть упорядочена по времени и не включать конец '
+        'периода.'
+    )
+    assert store.total(
+        'anna', datetime(2026, 10, 2), datetime(2026, 10, 5)
+    ) == sum(info.calories for _, info in result)
+    top = store.top('anna', 2)
+    assert [info.calories for _, info in top] == sorted(
+        (training.get_spent_calories() for training in runs.values()),
+        reverse=True
+    )[:2]
+    assert store.range('nobody') == []
+
+
+def test_validate_packages():
+    packages = [
+        ('SWM', [720, 1, 80, 25, 40]),
+        ('XXX', [1, 2, 3]),
+        ('RUN', [15000, 1]),
+        ('RUN', [15000, 0, 75]),
+        ('WLK', [9000, 1, 75, 0]),
+        ('WLK', [9000, 1, -75, 180]),
+        ('RUN', [15000, 'один', 75]),
+        ('RUN', [15000, 1, 75]),
+    ]
+    with Capturing() as output:
+        report = homework.validate_packages(packages)
+    assert output == [], 'Проверка пакетов не должна ничего печатать.'
+    assert list(report.errors) == [
+        homework.PACKAGE_OK,
+        homework.PACKAGE_UNKNOWN_TYPE,
+        homework.PACKAGE_BAD_ARITY,
+        homework.PACKAGE_ZERO_DIVISOR,
+        homework.PACKAGE_ZERO_DIVISOR,
+        homework.PACKAGE_NEGATIVE,
+        homework.PACKAGE_BAD_VALUE,
+        homework.PACKAGE_OK,
+    ]
+    assert report.get_bad_indexes() == [1, 2, 3, 4, 5, 6]
+    assert report.get_summary() == {
+        'без ошибок': 2,
+        'неизвестный код тренировки': 1,
+        'неверное число значений': 1,
+        'нечисловое значение': 1,
+        'ноль в делителе': 2,
+        'отрицательное значение': 1,
+    }
+    assert not report.is_valid()
+    assert homework.validate_packages(packages[:1]).is_valid()
+
+
+def test_MicroBatcher():
+    packages = [
+        ('SWM', [720, 1, 80, 25, 40]),
+        ('RUN', [15000, 1, 75]),
+        ('XXX', [1]),
+        ('WLK', [9000, 1, 75, 180]),
+    ] * 25
+    with homework.MicroBatcher(batch_size=16, max_delay=0.001) as batcher:
+        futures = [batcher.submit(*package) for package in packages]
+        results = [future.result(timeout=5) for future in futures]
+        stats = batcher.get_stats()
+    assert results[:2] == [
+        homework.read_package(*package).show_training_info()
+        for package in packages[:2]
+    ], 'Результаты пачек должны совпадать с расчётом по одному пакету.'
+    assert isinstance(results[2], homework.PackageError)
+    assert stats['queue_depth'] == 0
+    assert stats['flushes_by_size'] + stats['flushes_by_deadline'] > 0
+    assert stats['p99'] > 0
+
+
+def test_MicroBatcher_p99_window():
+    import random
+
+    with homework.MicroBatcher(window=50) as batcher:
+        latencies = [random.random() for _ in range(200)]
+        for latency in latencies:
+            batcher._add_latency(latency)
+        window = sorted(latencies[-50:])
+        assert batcher._sorted_latencies == window, (
+            'Отсортированная копия должна совпадать с окном задержек.'
+        )
+        assert batcher.get_p99() == window[int(0.99 * 49)]
+
+
+def test_MicroBatcher_package_error(monkeypatch):
+    read_package = homework.read_package
+
+    def broken_read_package(workout_type, data):
+        if workout_type == 'BAD':
+            raise ValueError(workout_type)
+        return read_package(workout_type, data)
+
+    monkeypatch.setattr(homework, 'read_package', broken_read_package)
+    with homework.MicroBatcher(batch_size=4, max_delay=0.001) as batcher:
+        futures = [batcher.submit('RUN', [15000, 1, 75]),
+                   batcher.submit('BAD', []),
+                   batcher.submit('RUN', [15000, 1, 75])]
+        assert isinstance(futures[1].exception(timeout=5), ValueError), (
+            'Ошибка пакета должна передаваться в его Future.'
+        )
+        assert futures[0].result(timeout=5) == futures[2].result(timeout=5)
+
+
+@pytest.mark.filterwarnings(
+    'ignore::pytest.PytestUnhandledThreadExceptionWarning'
+)
+def test_MicroBatcher_dead_thread(monkeypatch):
+    batcher = homework.MicroBatcher(max_delay=0.001)
+
+    def broken_adapt():
+        raise RuntimeError('adapt')
+
+    monkeypatch.setattr(batcher, '_adapt', broken_adapt)
+    batcher.submit('RUN', [15000, 1, 75]).result(timeout=5)
+    batcher._thread.join(timeout=5)
+    with pytest.raises(RuntimeError):
+        batcher.submit('RUN', [15000, 1, 75])
+
+
+@pytest.mark.parametrize('target_p99, check', [
+    (1e-12, lambda size: size == 1),
+    (60, lambda size: size > 16),
+])
+def test_MicroBatcher_adapt(target_p99, check):
+    with homework.MicroBatcher(target_p99=target_p99, batch_size=16,
+                               max_delay=0.0001) as batcher:
+        for _ in range(20):
+            futures = [batcher.submit('RUN', [15000, 1, 75])
+                       for _ in range(4)]
+            for future in futures:
+                future.result(timeout=5)
+    assert check(batcher.batch_size), (
+        'Размер пачки должен подстраиваться под целевую задержку.'
+    )